@@ -0,0 +1,80 @@
+import hashlib
+import os
+import tempfile
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "eq-hand")
+
+
+class AudioCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=2 * 1024**3):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, filename, fs, channels):
+        filename = os.path.abspath(filename)
+        mtime = os.stat(filename).st_mtime_ns
+        key = hashlib.sha1(f"{filename}|{mtime}|{fs}|{channels}".encode()).hexdigest()
+        return os.path.join(self.directory, key + ".f32")
+
+    def get(self, filename, fs, channels=1):
+        path = self._path(filename, fs, channels)
+        if not os.path.exists(path):
+            return None
+        # touching the entry keeps it at the young end of the LRU order
+        os.utime(path)
+        if os.path.getsize(path) == 0:
+            return np.zeros((0, channels), dtype=np.float32)
+        # interleaved frames, viewed as (frames, channels)
+        return np.memmap(path, dtype=np.float32, mode="r").reshape(-1, channels)
+
+    def put(self, filename, fs, samples):
+        samples = np.asarray(samples, dtype=np.float32).reshape(len(samples), -1)
+        writer = self.writer(filename, fs, samples.shape[1])
+        writer.write(samples)
+        writer.commit()
+        return self.get(filename, fs, samples.shape[1])
+
+    def writer(self, filename, fs, channels=1):
+        return CacheWriter(self, self._path(filename, fs, channels))
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".f32"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                # still mapped by a player (Windows); try again next time
+                continue
+            total -= size
+
+
+class CacheWriter:
+    def __init__(self, cache, path):
+        self.cache = cache
+        self.path = path
+        # one temp file per writer: the same track can be decoding twice at
+        # once (queued again while it still streams), the last commit wins
+        fd, self._part = tempfile.mkstemp(suffix=".part", dir=cache.directory)
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, samples):
+        samples.tofile(self._file)
+
+    def commit(self):
+        self._file.close()
+        os.replace(self._part, self.path)
+        self.cache.evict()
+
+    def abort(self):
+        self._file.close()
+        os.remove(self._part)
@@ -1,50 +1,271 @@
-from pydub import AudioSegment
 import sounddevice as sd
 import numpy as np
 import threading
+import time
+
+from Smoothing import LinearRamp
+from Playlist import Playlist, Track
+from RingBuffer import RingBuffer
+from Tracer import tracer
 
 
 class AudioPlayer:
-    def __init__(self, filename, eq_controller):
+    MIN_BLOCKSIZE = 128
+    MAX_BLOCKSIZE = 4096
+    # stream latency requested per block of buffering
+    LATENCY_BLOCKS = 2
+    # callback load is judged over windows of this many seconds
+    ADAPT_WINDOW = 1.0
+    GROW_LOAD = 0.7
+    SHRINK_LOAD = 0.25
+    SHRINK_AFTER = 5
+
+    def __init__(self, filename, eq_controller, streaming=False, cache=None,
+                 blocksize=1024, adaptive=True, crossfade=0.0):
         self.eq_controller = eq_controller
-        self.audio = AudioSegment.from_mp3(
-            filename).set_channels(1).set_frame_rate(44100)
-        self.samples = np.array(self.audio.get_array_of_samples()).astype(
-            np.float32) / 32768.0
-        self.fs = 44100
+        # play at the rate and channel count the EQ was designed for; with
+        # an EQ built from probe() that is the file's own format, later
+        # tracks are converted to it
+        self.fs = eq_controller.fs
+        self.channels = eq_controller.channels
+        self.track = Track(filename, self.fs, self.channels, streaming, cache)
+        # queued tracks are opened and pre-buffered in the background; the
+        # callback switches to the next one without a gap, or mixes it in
+        # over the last `crossfade` seconds
+        self.playlist = Playlist(self.fs, self.channels, streaming, cache)
+        self.crossfade_frames = int(crossfade * self.fs)
+        self._incoming = None
+        self._fade_pos = 0
+        self._fade_length = 0
+        self._block = np.zeros((self.MAX_BLOCKSIZE, self.channels), dtype=np.float32)
+        self._mix = np.zeros((self.MAX_BLOCKSIZE, self.channels), dtype=np.float32)
+        # processed output for meters; written by the callback, read by a
+        # SpectrumAnalyzer thread. When the reader falls behind, new blocks
+        # are dropped rather than waited for
+        self.meter_ring = RingBuffer(self.fs // 2, shape=(self.channels,))
         self.volume = 1.0  # default volume 100%
-        self.buffer_pos = 0
-        self.stop_playback = False
-        self.buffer_lock = threading.Lock()
+        self._volume_ramp = LinearRamp(self.volume, 0.02 * self.fs)
+        # transport: one long-lived stream; pause, resume and seek only change
+        # what the callback reads, never the stream itself
+        self.paused = True
+        self.at_end = False
+        self.finished = threading.Event()
+        self._was_playing = False
+        self._seek_request = None
+        self._seek_serial = 0
+        self._seek_applied = 0
+        self._thread = None
+        self._closing = False
+        self.underflows = 0
+        # block size / latency adaptation: the callback measures and decides,
+        # the transport thread reopens the stream
+        self.adaptive = adaptive
+        self.blocksize = blocksize
+        self.latency = self.LATENCY_BLOCKS * blocksize / self.fs
+        self.stream_latency = None
+        self.adaptations = []
+        self._pending = None
+        self._wake = threading.Event()
+        self._window_frames = 0
+        self._window_load = 0.0
+        self._window_underflows = 0
+        self._calm_windows = 0
+        # largest block size that has underflowed; never shrink back to it,
+        # or a machine that only copes one size up reopens the stream forever
+        self._underflow_blocksize = 0
 
     def callback(self, outdata, frames, time, status):
-        if self.stop_playback or (self.buffer_pos + frames > len(self.samples)):
-            outdata[:] = np.zeros((frames, 1))
-            raise sd.CallbackStop()
+        start = tracer.now()
+        if status.output_underflow:
+            self.underflows += 1
+            self._window_underflows += 1
+            tracer.mark("underflow")
+        request = self._seek_request
+        if request is not None and request[0] != self._seek_applied:
+            self._seek_applied = request[0]
+            # a seek is dropped if its track has already ended or is fading out
+            if request[1] is self.track and self._incoming is None:
+                self.track.position = request[2]
+                self.eq_controller.reset()
+                self.at_end = False
 
-        with self.buffer_lock:
-            chunk = self.samples[self.buffer_pos:self.buffer_pos + frames]
-            self.buffer_pos += frames
+        playing = not self.paused
+        if not playing and not self._was_playing:
+            outdata.fill(0)
+            return
+        if len(self._block) < frames:
+            self._block = np.zeros((frames, self.channels), dtype=np.float32)
+            self._mix = np.zeros((frames, self.channels), dtype=np.float32)
+        chunk = self._block[:frames]
+        if not self._fill(chunk):
+            if self.playlist.pending():
+                # the next track is still being opened
+                outdata.fill(0)
+            else:
+                self._end(outdata)
+            return
         # apply eq
         eq_chunk = self.eq_controller.process(chunk)
-        # adjust volume
-        eq_chunk *= self.volume
+        # adjust volume; a single float read, published by set_volume and
+        # ramped in over 20 ms so gesture steps do not click
+        eq_chunk *= self._volume_ramp.next(self.volume, frames)[0][:, None]
+        if playing != self._was_playing:
+            # fade over one block when pausing or resuming
+            fade = np.linspace(0.0, 1.0, frames) if playing else np.linspace(1.0, 0.0, frames)
+            eq_chunk *= fade[:, None]
+            self._was_playing = playing
         eq_chunk = np.clip(eq_chunk, -1.0, 1.0)
 
-        outdata[:] = eq_chunk.reshape(-1, 1)
+        outdata[:] = eq_chunk
+        self.meter_ring.write(eq_chunk)
+        tracer.span("callback", start)
+        if self.adaptive:
+            self._measure(frames, tracer.now() - start)
+
+    def _fill(self, chunk):
+        # reads the next block into chunk; False once there is nothing to play
+        if self.track.exhausted() and not self._advance():
+            return False
+        n = self.track.read(chunk)
+        if self._incoming is None and self.crossfade_frames:
+            remaining = self.track.remaining()
+            if remaining is not None and remaining < self.crossfade_frames:
+                self._incoming = self.playlist.take()
+                self._fade_pos = 0
+                self._fade_length = remaining + n
+        if self._incoming is not None:
+            mix = self._mix[:len(chunk)]
+            self._incoming.read(mix)
+            t = np.clip((self._fade_pos + np.arange(len(chunk))) / self._fade_length, 0.0, 1.0)
+            chunk *= (1.0 - t)[:, None]
+            chunk += mix * t[:, None]
+            self._fade_pos += len(chunk)
+            if self.track.exhausted():
+                self.playlist.retire(self.track)
+                self.track = self._incoming
+                self._incoming = None
+        elif n < len(chunk) and self.track.exhausted() and self._advance():
+            # gapless: the rest of the block comes from the next track
+            self.track.read(chunk[n:])
+        return True
+
+    def _advance(self):
+        track = self.playlist.take()
+        if track is None:
+            return False
+        self.playlist.retire(self.track)
+        self.track = track
+        return True
+
+    def _end(self, outdata):
+        outdata.fill(0)
+        self.paused = True
+        self._was_playing = False
+        self.at_end = True
+        self.finished.set()
+
+    def _measure(self, frames, elapsed_ns):
+        deadline_ns = frames / self.fs * 1e9
+        self._window_load = max(self._window_load, elapsed_ns / deadline_ns)
+        self._window_frames += frames
+        if self._window_frames < self.ADAPT_WINDOW * self.fs or self._pending:
+            return
+
+        if self._window_underflows or self._window_load > self.GROW_LOAD:
+            self._calm_windows = 0
+            if self._window_underflows:
+                self._underflow_blocksize = max(self._underflow_blocksize, self.blocksize)
+            if self.blocksize < self.MAX_BLOCKSIZE:
+                reason = "underflow" if self._window_underflows else "load"
+                self._pending = (self.blocksize * 2, reason, self._window_load)
+        elif self._window_load < self.SHRINK_LOAD:
+            self._calm_windows += 1
+            smaller = self.blocksize // 2
+            if (self._calm_windows >= self.SHRINK_AFTER and smaller >= self.MIN_BLOCKSIZE
+                    and smaller > self._underflow_blocksize):
+                self._calm_windows = 0
+                self._pending = (self.blocksize // 2, "headroom", self._window_load)
+        else:
+            self._calm_windows = 0
+        self._window_frames = 0
+        self._window_load = 0.0
+        self._window_underflows = 0
+        if self._pending:
+            self._wake.set()
 
     def set_volume(self, new_volume):
-        with self.buffer_lock:
-            self.volume = max(0.0, min(new_volume, 1.0))
+        # no lock: the callback must never wait on the GUI thread
+        self.volume = max(0.0, min(new_volume, 1.0))
 
     def get_volume(self):
         return self.volume
 
-    def play(self):
-        with sd.OutputStream(callback=self.callback,
-                             channels=1, samplerate=self.fs,
-                             blocksize=1024):
-            sd.sleep(int(len(self.samples) / self.fs * 1000))
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        # start as soon as the first blocks are decoded
+        self.track.wait_ready(4 * self.blocksize)
+        while not self._closing:
+            self._wake.clear()
+            with sd.OutputStream(callback=self.callback,
+                                 channels=self.channels, samplerate=self.fs,
+                                 blocksize=self.blocksize, latency=self.latency,
+                                 finished_callback=self._wake.set) as stream:
+                self.stream_latency = stream.latency
+                self._wake.wait()
+            if self._pending is not None:
+                self._resize(*self._pending)
+                self._pending = None
+
+    def _resize(self, blocksize, reason, load):
+        self.adaptations.append({
+            "time": time.time(), "reason": reason, "load": load,
+            "from_blocksize": self.blocksize, "to_blocksize": blocksize,
+            "underflows": self.underflows,
+        })
+        self.blocksize = blocksize
+        self.latency = self.LATENCY_BLOCKS * blocksize / self.fs
+
+    def enqueue(self, filename):
+        self.playlist.add(filename)
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        # after the last track ends, play it again from the start, unless the
+        # caller has already seeked somewhere the callback has not applied yet
+        seek_pending = self._seek_serial != self._seek_applied
+        if self.at_end and not self.playlist.pending() and not seek_pending:
+            self.seek(0.0)
+        self.finished.clear()
+        self.paused = False
+        self.start()
+
+    def seek(self, seconds):
+        track = self.track
+        frame = track.seek(max(0, int(round(seconds * self.fs))))
+        # handed to the callback, which moves the track position and flushes
+        # the EQ state at its next block boundary
+        self._seek_serial += 1
+        self._seek_request = (self._seek_serial, track, frame)
+
+    def position(self):
+        return self.track.position / self.fs
+
+    def duration(self):
+        return self.track.duration()
 
-    def stop(self):
-        self.stop_playback = True
+    def close(self):
+        self.paused = True
+        self._closing = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self.playlist.close()
+        self.track.close()
+        if self._incoming is not None:
+            self._incoming.close()
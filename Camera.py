@@ -1,11 +1,21 @@
-import math
+import getpass
 import os
 import pickle
+import threading
+import time
 import cv2
-from cvzone.HandTrackingModule import HandDetector
 import numpy as np
 
+from FramePool import FramePool
+from GestureFilter import GestureFilter
+from Landmarks import (
+    finger_codes, gain_from_distance, gesture_table, landmark_array, measure,
+    volume_from_angle)
+from Tracer import tracer
+
 CALIBRATION_FILE = "hand_range.calib"
+CALIBRATION_VERSION = 1
+CONFIG_DIR = os.path.join(os.path.expanduser("~"), ".config", "eq-hand")
 
 
 class Camera:
@@ -16,20 +26,97 @@ class Camera:
         "all": [1, 1, 1, 1, 1],
         "toggle": [1, 1, 0, 0, 1]  # gesture to turn on/off adjustment mode
     }
+    # finger bitmask -> gesture, looked up instead of comparing lists
+    GESTURE_NAMES, GESTURE_TABLE = gesture_table(GESTURE)
+    INIT_GESTURES = {
+        "max": [1, 1, 1, 1, 1],
+        "min": [1, 0, 0, 0, 0],
+        "done": [0, 0, 0, 0, 0],
+    }
+    INIT_NAMES, INIT_TABLE = gesture_table(INIT_GESTURES)
 
     EQ_RANGE = [0, 100]
     VOLUME_RANGE = (-50, 50)
     INITIAL_VOLUME_ANGLE = 60
+    # share of landmarks optical flow must keep before we re-detect
+    MIN_TRACKED_RATIO = 0.9
+    MAX_FLOW_ERROR = 20.0
 
-    def __init__(self, camera):
+    def __init__(self, camera, detect_interval=1, profile=None, config_dir=CONFIG_DIR):
         self.camera = camera
-        self.detector = HandDetector(detectionCon=0.6, maxHands=2)
+        # cvzone/MediaPipe load on first use, or ahead of it through warmup()
+        self._detector = None
+        self._detector_lock = threading.Lock()
+        # run the full detector every `detect_interval` frames and track
+        # the landmarks with optical flow in between
+        self.detect_interval = detect_interval
+        self._hands = []
+        self._gray = None
+        self._prev_gray = None
+        self._since_detect = 0
+        # frames are read into recycled buffers; consumers hand them back
+        # through release() once they are done with them
+        self.pool = None
 
         self.adjust_mode = False
-        self.prev_toggle_state = False
-        self.toggle_cooldown = 0
+        # majority vote, toggle debounce and gain/volume smoothing over time
+        self.gestures = GestureFilter()
         self.right_hand_range = [0, 0]
         self.palm_size = 0
+        # calibrations are kept per user account, and per profile within it
+        self.profile = profile or getpass.getuser()
+        self.calibration_path = os.path.join(config_dir, CALIBRATION_FILE)
+        # optional GestureRecorder that logs every handDetection result
+        self.recorder = None
+        # draw the measured thumb-index distance on the frame
+        self.draw_measures = False
+
+    @property
+    def detector(self):
+        if self._detector is None:
+            with self._detector_lock:
+                if self._detector is None:
+                    from cvzone.HandTrackingModule import HandDetector
+                    self._detector = HandDetector(detectionCon=0.6, maxHands=2)
+        return self._detector
+
+    def warmup(self):
+        return self.detector
+
+    def _readCalibrations(self):
+        try:
+            with open(self.calibration_path, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != CALIBRATION_VERSION:
+            # written by an incompatible version; calibrate again
+            return {}
+        return data["profiles"]
+
+    def loadCalibration(self):
+        # call after open(): the palm size only holds for the same frame size
+        entry = self._readCalibrations().get(self.profile)
+        if entry is None or (entry["width"], entry["height"]) != (self.width, self.height):
+            return False
+        self.right_hand_range = list(entry["right_hand_range"])
+        self.palm_size = entry["palm_size"]
+        return True
+
+    def saveCalibration(self):
+        profiles = self._readCalibrations()
+        profiles[self.profile] = {
+            "right_hand_range": list(self.right_hand_range),
+            "palm_size": self.palm_size,
+            "width": self.width,
+            "height": self.height,
+            "saved": time.time(),
+        }
+        os.makedirs(os.path.dirname(self.calibration_path), exist_ok=True)
+        part = self.calibration_path + ".part"
+        with open(part, "wb") as f:
+            pickle.dump({"version": CALIBRATION_VERSION, "profiles": profiles}, f)
+        os.replace(part, self.calibration_path)
 
     def open(self, width=720, height=480):
         self.vc = cv2.VideoCapture(self.camera)
@@ -42,128 +129,168 @@ class Camera:
         return self.vc.isOpened()
 
     def read(self, negative=False):
-        rval, frame = self.vc.read()
+        buffer = self.pool.acquire() if self.pool else None
+        start = tracer.now()
+        rval, frame = self.vc.read(buffer)
+        tracer.span("capture", start)
         if frame is not None:
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            # frames stay BGR for cvzone; displayFrame converts them for the GUI
+            if self.pool is None:
+                self.pool = FramePool(frame.shape)
             if negative:
-                frame = cv2.bitwise_not(frame)
+                cv2.bitwise_not(frame, dst=frame)
 
             self.current_frame = frame
             return frame
+        if buffer is not None:
+            self.pool.release(buffer)
+
+    def release(self, frame):
+        if self.pool is not None:
+            self.pool.release(frame)
+
+    def displayFrame(self, frame):
+        # BGR -> RGB into another pooled buffer, on the inference thread, so
+        # the GUI only wraps it; the BGR buffer goes back to the pool
+        if self.pool is None:
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        rgb = self.pool.acquire()
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+        self.pool.release(frame)
+        return rgb
+
+    def findHands(self, frame):
+        start = tracer.now()
+        result = self._findHands(frame)
+        tracer.span("findHands", start)
+        return result
+
+    def _findHands(self, frame):
+        if self.detect_interval <= 1:
+            return self.detector.findHands(frame)
+
+        # two gray buffers, swapped every frame, hold the previous and current image
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        hands = None
+        if self._hands and self._since_detect < self.detect_interval:
+            hands = self._trackHands(gray)
+            if hands is not None:
+                for hand in hands:
+                    for x, y, _ in hand["lmList"]:
+                        cv2.circle(frame, (x, y), 5, (255, 0, 255), cv2.FILLED)
+        if hands is None:
+            hands, frame = self.detector.findHands(frame)
+            self._since_detect = 0
+        self._since_detect += 1
+        self._hands = hands
+        self._gray = self._prev_gray
+        self._prev_gray = gray
+        return hands, frame
+
+    def _trackHands(self, gray):
+        landmarks = np.array([hand["lmList"] for hand in self._hands], dtype=np.float32)
+        p0 = np.ascontiguousarray(landmarks[:, :, :2]).reshape(-1, 1, 2)
+        p1, status, err = cv2.calcOpticalFlowPyrLK(
+            self._prev_gray, gray, p0, None, winSize=(21, 21), maxLevel=3)
+        if p1 is None:
+            return None
+        good = status.ravel() == 1
+        if good.mean() < self.MIN_TRACKED_RATIO or err[good].mean() > self.MAX_FLOW_ERROR:
+            return None
+
+        landmarks[:, :, :2] = p1.reshape(len(self._hands), 21, 2)
+        hands = []
+        for hand, points in zip(self._hands, landmarks):
+            x_min, y_min = points[:, :2].min(axis=0)
+            x_max, y_max = points[:, :2].max(axis=0)
+            w, h = int(x_max - x_min), int(y_max - y_min)
+            hands.append({
+                "lmList": np.rint(points).astype(int).tolist(),
+                "bbox": (int(x_min), int(y_min), w, h),
+                "center": (int(x_min) + w // 2, int(y_min) + h // 2),
+                "type": hand["type"],
+            })
+        return hands
+
+    @staticmethod
+    def _leftRight(hands):
+        # the image is mirrored: the left hand is the one further right
+        left = 0 if hands[0]["center"][0] >= hands[1]["center"][0] else 1
+        return left, 1 - left
+
+    def _drawMeasures(self, frame, landmarks):
+        x1, y1 = landmarks[8, :2].astype(int).tolist()
+        x2, y2 = landmarks[4, :2].astype(int).tolist()
+        cv2.circle(frame, (x1, y1), 15, (255, 0, 255), cv2.FILLED)
+        cv2.circle(frame, (x2, y2), 15, (255, 0, 255), cv2.FILLED)
+        cv2.line(frame, (x1, y1), (x2, y2), (255, 0, 255), 3)
 
     def initializeHandDetection(self, frame):
         hands, frame_copy = self.detector.findHands(frame)
 
-        INIT_CONTROL_GESTURES = {
-            "[1, 1, 1, 1, 1]": "max",
-            "[1, 0, 0, 0, 0]": "min",
-            "[0, 0, 0, 0, 0]": "done"
-        }
-
         if len(hands) == 2:
-            hand1, hand2 = hands
-            if hand1["center"][0] < hand2["center"][0]:
-                left_hand = hand2
-                right_hand = hand1
-            else:
-                left_hand = hand1
-                right_hand = hand2
-
-            fingers_left = self.detector.fingersUp(left_hand)
-            if str(fingers_left) not in INIT_CONTROL_GESTURES.keys():
+            left, right = self._leftRight(hands)
+            landmarks = landmark_array(hands)
+            code = finger_codes(landmarks[left], hands[left]["type"] == "Right")
+            gesture = self.INIT_NAMES[self.INIT_TABLE[code]]
+            if gesture == "none":
                 return False
 
-            gesture = INIT_CONTROL_GESTURES[str(fingers_left)]
-
             if gesture == "done":
+                if self.palm_size > 0:
+                    self.saveCalibration()
                 return True
 
-            thumb_index_distance, _, frame_copy = self.detector.findDistance(
-                right_hand["lmList"][8][:-1],
-                right_hand["lmList"][4][:-1],
-                frame_copy
-            )
-
-            self.palm_size, _, _ = self.detector.findDistance(
-                right_hand["lmList"][0][:-1],
-                right_hand["lmList"][5][:-1],
-                frame_copy
-            )
+            thumb_index_distance, palm_size, _ = measure(landmarks[right])
+            self.palm_size = float(palm_size)
 
             if gesture == "min":
-                self.right_hand_range[0] = thumb_index_distance
+                self.right_hand_range[0] = float(thumb_index_distance)
             else:
-                self.right_hand_range[1] = thumb_index_distance
+                self.right_hand_range[1] = float(thumb_index_distance)
 
         return False
 
-    def handDetection(self, frame):
-        hands, frame_copy = self.detector.findHands(frame)
+    def handDetection(self, frame, timestamp=None):
+        hands, frame_copy = self.findHands(frame)
+        return (frame_copy,) + self.decodeHands(hands, timestamp, frame_copy)
 
-        freq_band = "none"
+    def decodeHands(self, hands, timestamp=None, frame=None):
+        # detector output -> (freq_band, gain, volume, adjust_mode); needs no
+        # camera or detector, so it also serves landmarks from elsewhere
+        start = tracer.now()
+
+        gesture = "none"
         gain = 0.5
         volume = 0.5
 
         if len(hands) == 2:
-            hand1, hand2 = hands
-            if hand1["center"][0] < hand2["center"][0]:
-                left_hand = hand2
-                right_hand = hand1
-            else:
-                left_hand = hand1
-                right_hand = hand2
-
-            fingers_left = self.detector.fingersUp(left_hand)
-            # == Adjustment Mode ==
-            if fingers_left == self.GESTURE["toggle"]:
-                if not self.prev_toggle_state and self.toggle_cooldown == 0:
-                    self.adjust_mode = not self.adjust_mode
-                    self.toggle_cooldown = 20
-                self.prev_toggle_state = True
-            else:
-                self.prev_toggle_state = False
-
-            if self.toggle_cooldown > 0:
-                self.toggle_cooldown -= 1
+            left, right = self._leftRight(hands)
+            landmarks = landmark_array(hands)
+            code = finger_codes(landmarks[left], hands[left]["type"] == "Right")
+            gesture = self.GESTURE_NAMES[self.GESTURE_TABLE[code]]
 
             # == EQ and Volume Control ==
-
-            if self.adjust_mode:
-                for control, gesture in self.GESTURE.items():
-                    if fingers_left == gesture:
-                        freq_band = control
-
-                        if control == "all":  # adjust the volume
-                            wrist = np.array(right_hand['lmList'][0])
-                            middle_tip = np.array(right_hand['lmList'][12])
-
-                            dx = middle_tip[0] - wrist[0]
-                            dy = middle_tip[1] - wrist[1]
-                            angle = - \
-                                math.degrees(math.atan2(dy, dx)) - \
-                                self.INITIAL_VOLUME_ANGLE
-                            angle_clamped = max(
-                                self.VOLUME_RANGE[0], min(self.VOLUME_RANGE[1], angle))
-
-                            volume = (
-                                angle_clamped - self.VOLUME_RANGE[0]) / (self.VOLUME_RANGE[1] - self.VOLUME_RANGE[0])
-
-                        else:  # adjust the eq
-                            thumb_index_distance, info, frame_copy = self.detector.findDistance(
-                                right_hand["lmList"][8][:-1],
-                                right_hand["lmList"][4][:-1],
-                                frame_copy
-                            )
-
-                            palm_size, _, _ = self.detector.findDistance(
-                                right_hand["lmList"][0][:-1],
-                                right_hand["lmList"][5][:-1],
-                                frame_copy
-                            )
-                            scale = palm_size / self.palm_size
-                            resized_range = [x*scale for x in self.right_hand_range]
-                            gain = self.EQ_RANGE[0]+((thumb_index_distance-resized_range[0])*(
-                                self.EQ_RANGE[1]-self.EQ_RANGE[0]))/(resized_range[1]-resized_range[0])
-                        break
-
-        return frame_copy, freq_band, gain, volume, self.adjust_mode
+            if gesture != "none":
+                # distance, palm size and angle of the right hand in one step
+                distance, palm, angle = measure(landmarks[right])
+                if gesture == "all":  # adjust the volume
+                    volume = float(volume_from_angle(
+                        angle, self.INITIAL_VOLUME_ANGLE, self.VOLUME_RANGE))
+                else:  # adjust the eq
+                    gain = float(gain_from_distance(
+                        distance, palm, self.palm_size, self.right_hand_range, self.EQ_RANGE))
+                    if self.draw_measures and frame is not None:
+                        self._drawMeasures(frame, landmarks[right])
+
+        # == Adjustment Mode ==
+        # the filter owns the toggle and decides what is worth sending
+        t = time.perf_counter() if timestamp is None else timestamp
+        freq_band, gain, volume, self.adjust_mode = self.gestures.update(
+            t, gesture, gain, volume)
+
+        tracer.span("decode", start)
+        if self.recorder is not None:
+            self.recorder.record(hands, freq_band, gain, volume, self.adjust_mode, t)
+
+        return freq_band, gain, volume, self.adjust_mode
@@ -1,13 +1,40 @@
+from collections import namedtuple
 import numpy as np
 from scipy import signal
 
+from FFTEQ import FFTEQ
+from FilterBank import FilterBank
+from GraphicEQ import GraphicEQ
+from ParametricEQ import ParametricEQ
+from Smoothing import LinearRamp
+from Tracer import tracer
+
+ENGINES = ("crossover", "parametric", "graphic", "fft")
+# engines with N bands addressed by index
+BAND_ENGINES = ("graphic", "fft")
+
+# Immutable snapshots handed from the control side (GUI / gestures) to the
+# audio callback. Setters build a complete new snapshot and publish it with a
+# single reference store; process() reads it once per block, so the callback
+# never sees half-updated coefficients and never takes a lock. `sos` holds
+# the active engine's coefficients (the partitioned response for "fft").
+EQParams = namedtuple("EQParams", ["gains", "sos", "limiter", "published"])
+LimiterParams = namedtuple(
+    "LimiterParams", ["enabled", "threshold", "attack", "release", "lookahead"])
+
 
 class EQController:
     def __init__(self, fs,
                  low_cut=300.0, mid_center=2000.0, mid_bandwidth=800.0,
                  high_cut=10000, order=2,
-                 limiter_threshold_db=-1.0, limiter_attack_ms=1.0, limiter_release_ms=100.0):
+                 limiter_threshold_db=-1.0, limiter_attack_ms=1.0, limiter_release_ms=100.0,
+                 limiter_lookahead_ms=0.0, engine="crossover", smoothing_ms=20.0,
+                 channels=1, bands=10):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown EQ engine {engine!r}, expected one of {ENGINES}")
         self.fs = fs
+        self.channels = channels
+        self.engine = engine
         self.low_cut = low_cut
         self.mid_center = mid_center
         self.mid_bandwidth = mid_bandwidth
@@ -19,35 +46,114 @@ class EQController:
         # Attack/release coefficients
         self.attack_coeff = np.exp(-1.0 / (limiter_attack_ms * fs * 0.001))
         self.release_coeff = np.exp(-1.0 / (limiter_release_ms * fs * 0.001))
-        # State variable for gain smoothing
+        self.lookahead = int(round(limiter_lookahead_ms * fs * 0.001))
+        # State variables for gain smoothing, carried across blocks
         self._limiter_gain = 1.0
+        self._lookahead_x = np.zeros((self.lookahead, channels))
+        self._lookahead_t = np.ones(self.lookahead)
+        # deepest gain reduction (dB) since a meter last read and cleared it
+        self.gain_reduction_db = 0.0
         # Default gains
         self.gain_low = 1.0
         self.gain_mid = 1.0
         self.gain_high = 1.0
-        # Design initial filters
+        # Gain and coefficient changes are ramped in over smoothing_ms
+        ramp_samples = int(smoothing_ms * fs * 0.001)
+        self._gain_ramp = LinearRamp([1.0, 1.0, 1.0], ramp_samples)
+        # Design initial filters. Every engine but the crossover is a
+        # processor with the same set_bands/set_gains/process interface
+        self.bank = None
+        self.processor = None
+        if engine == "parametric":
+            # single cascaded shelf/peak chain with the gains baked in
+            self.processor = ParametricEQ(fs, ramp_samples=ramp_samples, channels=channels)
+        elif engine == "graphic":
+            # N peaking bands, also addressed by index
+            self.processor = GraphicEQ(fs, n_bands=bands, ramp_samples=ramp_samples,
+                                       channels=channels)
+        elif engine == "fft":
+            # linear-phase overlap-save convolution; gain changes crossfade
+            # over one partition instead of ramping
+            self.processor = FFTEQ(fs, n_bands=bands, channels=channels)
+        self._params = None
+        self._picked_up = None
         self._design_filters()
+        if engine == "crossover":
+            self.bank = FilterBank(self._params.sos, channels=channels)
 
     @staticmethod
     def db_to_linear(db):
         return 10 ** (db / 20.0)
 
     def _design_filters(self):
+        start = tracer.now()
         low_edge = max(0.0, self.mid_center - self.mid_bandwidth/2)
         high_edge = min(self.fs/2, self.mid_center + self.mid_bandwidth/2)
         lc = np.clip(self.low_cut, 0.0, self.fs/2)
         hc = np.clip(self.high_cut, 0.0, self.fs/2)
-        self.sos_low = signal.butter(
-            self.order, lc, btype='low', fs=self.fs, output='sos')
-        self.sos_mid = signal.butter(
-            self.order, [low_edge, high_edge], btype='band', fs=self.fs, output='sos')
-        self.sos_high = signal.butter(
-            self.order, hc, btype='high', fs=self.fs, output='sos')
+        # graphic/fft bands stay put; the cutoffs decide which of them follow
+        # the low, mid and high gains
+        if self.processor is not None:
+            self.processor.set_bands(lc, self.mid_center, self.mid_bandwidth, hc)
+        else:
+            self.sos_low = signal.butter(
+                self.order, lc, btype='low', fs=self.fs, output='sos')
+            self.sos_mid = signal.butter(
+                self.order, [low_edge, high_edge], btype='band', fs=self.fs, output='sos')
+            self.sos_high = signal.butter(
+                self.order, hc, btype='high', fs=self.fs, output='sos')
+            # one tuple per design, so the filter bank can spot a new design by identity
+            self._sos_bands = (self.sos_low, self.sos_mid, self.sos_high)
+        tracer.span("design", start)
+        self._publish()
+
+    def _publish(self):
+        if self.engine == "fft":
+            sos = self.processor.response
+        elif self.processor is not None:
+            sos = self.processor.sos
+        else:
+            sos = self._sos_bands
+        self._params = EQParams(
+            gains=(self.gain_low, self.gain_mid, self.gain_high),
+            sos=sos,
+            limiter=LimiterParams(self.limiter_enabled, self.limiter_threshold,
+                                  self.attack_coeff, self.release_coeff, self.lookahead),
+            published=tracer.now())
+
+    @property
+    def latency(self):
+        # samples the output trails the input: the fft engine's convolution
+        # delay plus the limiter look-ahead
+        delay = self.processor.latency if self.engine == "fft" else 0
+        return delay + (self.lookahead if self.limiter_enabled else 0)
 
     def set_gain(self, low_db=0.0, mid_db=0.0, high_db=0.0):
         self.gain_low = self.db_to_linear(low_db)
         self.gain_mid = self.db_to_linear(mid_db)
         self.gain_high = self.db_to_linear(high_db)
+        if self.processor is not None:
+            self.processor.set_gains(low_db, mid_db, high_db)
+        self._publish()
+
+    @property
+    def n_bands(self):
+        return self.processor.n_bands if self.engine in BAND_ENGINES else 3
+
+    def band_gains(self):
+        # gain of every band in dB, by index
+        if self.engine in BAND_ENGINES:
+            return self.processor.gains_db.tolist()
+        return [20 * np.log10(g) for g in (self.gain_low, self.gain_mid, self.gain_high)]
+
+    def set_band_gain(self, index, gain_db):
+        if self.engine in BAND_ENGINES:
+            self.processor.set_band_gain(index, gain_db)
+            self._publish()
+            return
+        gains_db = self.band_gains()
+        gains_db[index] = gain_db
+        self.set_gain(*gains_db)
 
     def set_low_cut(self, low_cut):
         self.low_cut = low_cut
@@ -65,7 +171,8 @@ class EQController:
         self.high_cut = high_cut
         self._design_filters()
 
-    def set_limiter(self, threshold_db=None, attack_ms=None, release_ms=None, enabled=None):
+    def set_limiter(self, threshold_db=None, attack_ms=None, release_ms=None, enabled=None,
+                    lookahead_ms=None):
         if threshold_db is not None:
             self.limiter_threshold = self.db_to_linear(threshold_db)
         if attack_ms is not None:
@@ -74,37 +181,104 @@ class EQController:
             self.release_coeff = np.exp(-1.0 / (release_ms * self.fs * 0.001))
         if enabled is not None:
             self.limiter_enabled = enabled
+        if lookahead_ms is not None:
+            self.lookahead = int(round(lookahead_ms * self.fs * 0.001))
+        self._publish()
 
-    def _limit_sample(self, sample):
-        # instantaneous peak level
-        level = abs(sample)
-        if level > self.limiter_threshold:
-            target_gain = self.limiter_threshold / (level + 1e-15)
-        else:
-            target_gain = 1.0
-        # smooth gain: attack (downward) vs release (upward)
-        if target_gain < self._limiter_gain:
-            coeff = self.attack_coeff
-        else:
-            coeff = self.release_coeff
-        self._limiter_gain = coeff * \
-            self._limiter_gain + (1 - coeff) * target_gain
-        return sample * self._limiter_gain
+    def reset(self):
+        # forget filter and limiter history, e.g. after a seek; call from the
+        # audio thread, between blocks
+        if self.bank is not None:
+            self.bank.reset()
+        if self.processor is not None:
+            self.processor.reset()
+        self._limiter_gain = 1.0
+        self._lookahead_x.fill(0.0)
+        self._lookahead_t.fill(1.0)
+
+    # longest stretch solved in one go; keeps the running product of the
+    # smoothing coefficients well inside float range
+    LIMITER_SPAN = 1024
+
+    def _limit_block(self, x, params=None):
+        # x is (frames, channels); all channels share one gain so the
+        # stereo image does not shift under limiting
+        params = params or self._params.limiter
+        n = len(x)
+        level = np.abs(x).max(axis=1)
+        target = np.ones(n)
+        over = level > params.threshold
+        target[over] = params.threshold / (level[over] + 1e-15)
+
+        lookahead = params.lookahead
+        if len(self._lookahead_x) != lookahead:
+            self._lookahead_x = np.zeros((lookahead, x.shape[1]))
+            self._lookahead_t = np.ones(lookahead)
+        if lookahead:
+            # delay the audio and let the gain see the next `lookahead` peaks
+            x_ext = np.concatenate((self._lookahead_x, x))
+            t_ext = np.concatenate((self._lookahead_t, target))
+            self._lookahead_x = x_ext[n:]
+            self._lookahead_t = t_ext[n:]
+            x = x_ext[:n]
+            target = np.lib.stride_tricks.sliding_window_view(
+                t_ext, lookahead + 1).min(axis=1)
+
+        gain = np.empty(n)
+        for i in range(0, n, self.LIMITER_SPAN):
+            end = min(n, i + self.LIMITER_SPAN)
+            self._limiter_gain = self._smooth_gain(
+                target[i:end], gain[i:end], params.attack, params.release)
+        self.gain_reduction_db = max(self.gain_reduction_db, -20 * np.log10(gain.min()))
+        return x * gain[:, None]
+
+    def _smooth_gain(self, target, gain, attack, release):
+        # per sample: gain follows target with the attack coefficient when it
+        # has to fall and the release coefficient when it may rise. With the
+        # branch of every sample known this is a linear recurrence solved
+        # with cumulative sums; guess the branches, solve, and re-solve from
+        # the first sample whose guess was wrong. Everything before it is
+        # exact, so each pass gains ground. Guessing against the gain at the
+        # start of the stretch is right often enough for 1-2 passes on music
+        prev = self._limiter_gain
+        falling = target < prev
+        start = 0
+        while True:
+            t = target[start:]
+            coeff = np.where(falling[start:], attack, release)
+            decay = np.exp(np.cumsum(np.log(coeff)))
+            solved = decay * (prev + np.cumsum((1 - coeff) * t / decay))
+            gain[start:] = solved
+            actual = t < np.concatenate(([prev], solved[:-1]))
+            wrong = np.flatnonzero(actual != falling[start:])
+            if not len(wrong):
+                return gain[-1]
+            falling[start:] = actual
+            if wrong[0]:
+                start += wrong[0]
+                prev = gain[start - 1]
 
     def process(self, x):
+        params = self._params
+        if params is not self._picked_up:
+            self._picked_up = params
+            tracer.span("pickup", params.published)
         x = np.asarray(x, dtype=np.float64)
-        # EQ bands
-        low = signal.sosfilt(self.sos_low, x)
-        mid = signal.sosfilt(self.sos_mid, x)
-        high = signal.sosfilt(self.sos_high, x)
-        out = self.gain_low * low + self.gain_mid * mid + self.gain_high * high
-        if not self.limiter_enabled:
-            return out
-        # apply limiter sample-by-sample
-        y = np.zeros_like(out)
-        for n, s in enumerate(out):
-            y[n] = self._limit_sample(s)
-        return y
+        # blocks are filtered as (frames, channels); mono input is a 1-D view
+        mono = x.ndim == 1
+        if mono:
+            x = x[:, None]
+        if self.processor is not None:
+            out = self.processor.process(x, params.sos)
+        else:
+            # EQ bands, filter state carried over from the previous block
+            bands = self.bank.process(x, params.sos)
+            gains = self._gain_ramp.next(params.gains, len(x))
+            bands *= gains[:, :, None]
+            out = bands.sum(axis=0)
+        if params.limiter.enabled:
+            out = self._limit_block(out, params.limiter)
+        return out[:, 0] if mono else out
 
 
 if __name__ == "__main__":
@@ -0,0 +1,104 @@
+import numpy as np
+
+from GraphicEQ import BandRegions, band_centers
+
+
+class FFTEQ(BandRegions):
+    # Linear-phase EQ: the band gains are interpolated into a curve on the
+    # FFT grid, turned into a windowed FIR and applied with uniformly
+    # partitioned overlap-save convolution. The cost does not depend on the
+    # number of bands or how steep the curve is; the price is a latency of
+    # `partition + taps / 2` samples.
+    def __init__(self, fs, centers=None, n_bands=10, partition=512, taps=4096, channels=1):
+        self.fs = fs
+        self.centers = np.asarray(band_centers(n_bands) if centers is None else centers,
+                                  dtype=np.float64)
+        self.n_bands = len(self.centers)
+        self.gains_db = np.zeros(self.n_bands)
+        self.partition = partition
+        self.n_parts = max(1, -(-taps // partition))
+        self.taps = self.n_parts * partition
+        # periodic window, symmetric about the FIR's center tap
+        self._window = np.blackman(self.taps + 1)[:self.taps]
+        self._freqs = np.fft.rfftfreq(self.taps, 1.0 / fs)
+        self._fade = np.arange(1, partition + 1)[:, None] / partition
+        # block-to-block state: the last two partitions of input, the
+        # frequency-domain delay line, and partial input/output partitions
+        self._frame = np.zeros((2 * partition, channels))
+        self._fdl = np.zeros((self.n_parts, partition + 1, channels), dtype=np.complex128)
+        self._in = np.zeros((partition, channels))
+        self._out = np.zeros((partition, channels))
+        self._fill = 0
+        self._update()
+        self._applied = self.response
+
+    @property
+    def latency(self):
+        return self.partition + self.taps // 2
+
+    def set_band_gains(self, gains_db):
+        self.gains_db = np.broadcast_to(
+            np.asarray(gains_db, dtype=np.float64), (self.n_bands,)).copy()
+        self._update()
+
+    def set_band(self, index, center=None, q=None):
+        # q is accepted for GraphicEQ compatibility; the curve has no Q
+        if center is not None:
+            self.centers = self.centers.copy()
+            self.centers[index] = center
+            self._update()
+
+    def _update(self):
+        # gains in dB, linear in log-frequency between band centers
+        order = np.argsort(self.centers)
+        db = np.interp(np.log2(np.maximum(self._freqs, 1.0)),
+                       np.log2(self.centers[order]), self.gains_db[order])
+        h = np.fft.irfft(10 ** (db / 20.0), n=self.taps)
+        h = np.roll(h, self.taps // 2) * self._window
+        parts = np.zeros((self.n_parts, 2 * self.partition))
+        parts[:, :self.partition] = h.reshape(self.n_parts, self.partition)
+        # a fresh array swapped in with one store
+        self.response = np.fft.rfft(parts, axis=1)
+
+    def reset(self):
+        self._frame.fill(0.0)
+        self._fdl.fill(0.0)
+        self._in.fill(0.0)
+        self._out.fill(0.0)
+        self._fill = 0
+
+    def process(self, x, response=None):
+        response = self.response if response is None else response
+        P = self.partition
+        y = np.empty(x.shape)
+        i = 0
+        # any block size works: input is gathered into whole partitions and
+        # output runs one partition behind
+        while i < len(x):
+            n = min(P - self._fill, len(x) - i)
+            self._in[self._fill:self._fill + n] = x[i:i + n]
+            y[i:i + n] = self._out[self._fill:self._fill + n]
+            self._fill += n
+            i += n
+            if self._fill == P:
+                self._convolve(response)
+                self._fill = 0
+        return y
+
+    def _convolve(self, response):
+        P = self.partition
+        self._frame[:P] = self._frame[P:]
+        self._frame[P:] = self._in
+        self._fdl[1:] = self._fdl[:-1]
+        self._fdl[0] = np.fft.rfft(self._frame, axis=0)
+        out = self._filter(response)
+        if response is not self._applied:
+            # crossfade from the old response over one partition
+            old = self._filter(self._applied)
+            out = old + self._fade * (out - old)
+            self._applied = response
+        self._out[:] = out
+
+    def _filter(self, response):
+        spectrum = np.einsum("kfc,kf->fc", self._fdl, response)
+        return np.fft.irfft(spectrum, n=2 * self.partition, axis=0)[self.partition:]
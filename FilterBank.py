@@ -0,0 +1,65 @@
+import numpy as np
+from scipy import signal
+
+
+class FilterBank:
+    def __init__(self, sos_bands, fade_length=256, channels=1):
+        self.fade_length = fade_length
+        self.channels = channels
+        self._ramp = np.arange(1, fade_length + 1) / fade_length
+        self._source = sos_bands
+        self.sos = [np.asarray(sos) for sos in sos_bands]
+        # per-band, per-channel state for filtering (frames, channels) blocks
+        self.zi = [np.zeros((len(sos), 2, channels)) for sos in self.sos]
+        # outgoing filters while a coefficient change is being crossfaded
+        self._old_sos = None
+        self._old_zi = None
+        self._fade_pos = 0
+
+    def set_sos(self, sos_bands):
+        self._source = sos_bands
+        new_sos = [np.asarray(sos) for sos in sos_bands]
+        new_zi = []
+        for sos, zi in zip(new_sos, self.zi):
+            # transfer state when the band keeps its structure, so the new
+            # filter starts close to where the old one left off
+            if zi.shape[0] == len(sos):
+                new_zi.append(zi.copy())
+            else:
+                new_zi.append(np.zeros((len(sos), 2, self.channels)))
+        if self._old_sos is None:
+            self._old_sos = self.sos
+            self._old_zi = self.zi
+        self._fade_pos = 0
+        self.sos = new_sos
+        self.zi = new_zi
+
+    def reset(self):
+        for zi in self.zi:
+            zi.fill(0.0)
+        self._old_sos = None
+        self._old_zi = None
+
+    def process(self, x, sos_bands=None):
+        # a new coefficient set published by the control side is adopted
+        # here, at a block boundary on the audio thread
+        if sos_bands is not None and sos_bands is not self._source:
+            self.set_sos(sos_bands)
+        out = np.empty((len(self.sos),) + x.shape)
+        for i, sos in enumerate(self.sos):
+            out[i], self.zi[i] = signal.sosfilt(sos, x, axis=0, zi=self.zi[i])
+        if self._old_sos is not None:
+            self._crossfade(x, out)
+        return out
+
+    def _crossfade(self, x, out):
+        n = min(len(x), self.fade_length - self._fade_pos)
+        mix = self._ramp[self._fade_pos:self._fade_pos + n, None]
+        for i, sos in enumerate(self._old_sos):
+            old, self._old_zi[i] = signal.sosfilt(
+                sos, x[:n], axis=0, zi=self._old_zi[i])
+            out[i, :n] = old + mix * (out[i, :n] - old)
+        self._fade_pos += n
+        if self._fade_pos >= self.fade_length:
+            self._old_sos = None
+            self._old_zi = None
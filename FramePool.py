@@ -0,0 +1,22 @@
+import queue
+import numpy as np
+
+
+class FramePool:
+    def __init__(self, shape, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self.allocated = 0
+        self._free = queue.SimpleQueue()
+
+    def acquire(self):
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            # grows only until it covers the frames in flight
+            self.allocated += 1
+            return np.empty(self.shape, dtype=self.dtype)
+
+    def release(self, frame):
+        if frame.shape == self.shape and frame.dtype == self.dtype:
+            self._free.put(frame)
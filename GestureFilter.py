@@ -0,0 +1,98 @@
+import collections
+import math
+
+
+class OneEuroFilter:
+    # Casiez et al.: a low-pass whose cutoff rises with the signal's speed,
+    # smooth when the hand is still and responsive when it moves
+    def __init__(self, min_cutoff=1.0, beta=0.05, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self._x = None
+        self._dx = 0.0
+        self._t = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, x, t):
+        if self._x is None:
+            self._x, self._t = x, t
+            return x
+        dt = t - self._t
+        if dt <= 0:
+            return self._x
+        self._t = t
+        a = self._alpha(self.d_cutoff, dt)
+        self._dx += a * ((x - self._x) / dt - self._dx)
+        a = self._alpha(self.min_cutoff + self.beta * abs(self._dx), dt)
+        self._x += a * (x - self._x)
+        return self._x
+
+
+class GestureFilter:
+    # Turns per-frame gesture guesses into a stable control stream: the band
+    # is a majority vote over the last `vote_window` seconds, the toggle
+    # flips adjust mode once per hold and at most every `toggle_rearm`
+    # seconds, and gain/volume are smoothed and only move in steps of at
+    # least `gain_step` / `volume_step`, so small jitter sends no update.
+    def __init__(self, vote_window=0.2, toggle_rearm=0.7, gain_step=2.0, volume_step=0.02,
+                 min_cutoff=1.0, beta=0.05):
+        self.vote_window = vote_window
+        self.toggle_rearm = toggle_rearm
+        self.gain_step = gain_step
+        self.volume_step = volume_step
+        self.adjust_mode = False
+        self.band = "none"
+        self.gain = 0.5
+        self.volume = 0.5
+        self._votes = collections.deque()
+        self._counts = collections.Counter()
+        self._toggle_held = False
+        self._last_toggle = -math.inf
+        self._gain_filter = OneEuroFilter(min_cutoff, beta)
+        self._volume_filter = OneEuroFilter(min_cutoff, beta)
+
+    def _vote(self, t, gesture):
+        self._votes.append((t, gesture))
+        self._counts[gesture] += 1
+        while self._votes[0][0] < t - self.vote_window:
+            self._counts[self._votes.popleft()[1]] -= 1
+        winner, count = self._counts.most_common(1)[0]
+        # no majority: keep the current band until one emerges
+        return winner if 2 * count > len(self._votes) else self.band
+
+    def update(self, t, gesture, gain, volume):
+        band = self._vote(t, gesture)
+        if band == "toggle":
+            if not self._toggle_held and t - self._last_toggle >= self.toggle_rearm:
+                self.adjust_mode = not self.adjust_mode
+                self._last_toggle = t
+            self._toggle_held = True
+        else:
+            self._toggle_held = False
+
+        if band != self.band:
+            # a new band starts from its own reading, not the old one's
+            self.band = band
+            self._gain_filter.reset()
+            self._volume_filter.reset()
+            self.gain = self._gain_filter(gain, t)
+            self.volume = self._volume_filter(volume, t)
+        elif band == "all":
+            volume = self._volume_filter(volume, t)
+            if abs(volume - self.volume) >= self.volume_step:
+                self.volume = volume
+        elif band != "none":
+            gain = self._gain_filter(gain, t)
+            if abs(gain - self.gain) >= self.gain_step:
+                self.gain = gain
+
+        freq_band = self.band if self.adjust_mode else "none"
+        return freq_band, self.gain, self.volume, self.adjust_mode
@@ -0,0 +1,168 @@
+import struct
+import time
+import numpy as np
+
+MAGIC = b"EQGL"
+VERSION = 1
+BANDS = ["none", "bass", "mid", "treble", "all", "toggle"]
+HAND_TYPES = ["Left", "Right"]
+
+# header: magic, version, frame width/height, palm size, calibrated range
+HEADER = struct.Struct("<4sHHHfff")
+# record: timestamp, band, gain, volume, adjust mode, number of hands
+RECORD = struct.Struct("<dBffBB")
+LANDMARKS_BYTES = 21 * 3 * 2
+
+
+def apply_gesture(eq_controller, player, freq_band, gain, volume):
+    # the gesture -> parameter mapping shared by the GUI and headless replays;
+    # returns the gain in dB for EQ bands, None otherwise
+    if freq_band in ["none", "toggle"]:
+        return None
+    if freq_band == "all":
+        player.set_volume(volume)
+        return None
+    gain_db = int(-20 + (gain / 100.0) * 30)
+    if freq_band == "bass":
+        eq_controller.set_gain(low_db=gain_db)
+    elif freq_band == "mid":
+        eq_controller.set_gain(mid_db=gain_db)
+    elif freq_band == "treble":
+        eq_controller.set_gain(high_db=gain_db)
+    return gain_db
+
+
+class GestureRecorder:
+    def __init__(self, path, camera):
+        self.camera = camera
+        self._file = open(path, "wb")
+        self._start = None
+
+    def record(self, hands, freq_band, gain, volume, adjust_mode, timestamp=None):
+        # timestamp: the one the gesture filter saw, so a replay filters alike
+        t = time.monotonic() if timestamp is None else timestamp
+        if self._start is None:
+            # the header is written on the first result, once calibration is done
+            self._file.write(HEADER.pack(
+                MAGIC, VERSION, self.camera.width, self.camera.height,
+                self.camera.palm_size, *self.camera.right_hand_range))
+            self._start = t
+        self._file.write(RECORD.pack(
+            t - self._start, BANDS.index(freq_band),
+            gain, volume, adjust_mode, len(hands)))
+        for hand in hands:
+            self._file.write(bytes([HAND_TYPES.index(hand["type"])]))
+            self._file.write(np.asarray(hand["lmList"], dtype=np.int16).tobytes())
+
+    def close(self):
+        self._file.close()
+
+
+def _center(landmarks):
+    # cvzone's hand center: the middle of the landmarks' bounding box
+    x_min, y_min = landmarks[:, :2].min(axis=0)
+    x_max, y_max = landmarks[:, :2].max(axis=0)
+    return (int(x_min) + int(x_max - x_min) // 2, int(y_min) + int(y_max - y_min) // 2)
+
+
+def read_log(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, width, height, palm_size, low, high = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} gesture log")
+    header = {"width": width, "height": height,
+              "palm_size": palm_size, "hand_range": [low, high]}
+    records = []
+    offset = HEADER.size
+    while offset < len(data):
+        t, band, gain, volume, adjust_mode, n_hands = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        hands = []
+        for _ in range(n_hands):
+            hand_type = HAND_TYPES[data[offset]]
+            landmarks = np.frombuffer(data, dtype=np.int16, count=63, offset=offset + 1)
+            landmarks = landmarks.reshape(21, 3)
+            hands.append({"type": hand_type, "lmList": landmarks.tolist(),
+                          "center": _center(landmarks)})
+            offset += 1 + LANDMARKS_BYTES
+        records.append((t, hands, BANDS[band], gain, volume, bool(adjust_mode)))
+    return header, records
+
+
+class _ReplayFrame(np.ndarray):
+    # a blank frame that carries the log record it stands for, so the result
+    # stays tied to the frame even when the tracker drops or reorders frames
+    record = None
+
+
+class ReplayCamera:
+    def __init__(self, path, realtime=True, loop=False):
+        from Camera import Camera
+
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        header, self.records = read_log(path)
+        self.width = header["width"]
+        self.height = header["height"]
+        # recorded landmarks are decoded and filtered again, the same way
+        # Camera.handDetection does with live detector output
+        self.decoder = Camera(None)
+        self.decoder.width = self.width
+        self.decoder.height = self.height
+        self.decoder.palm_size = header["palm_size"]
+        self.decoder.right_hand_range = header["hand_range"]
+        self.palm_size = header["palm_size"]
+        self.right_hand_range = header["hand_range"]
+        self.adjust_mode = False
+        self._frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        self._index = 0
+        self._start = None
+        self.timestamp = 0.0
+
+    def open(self, width=720, height=480):
+        self._index = 0
+        self._start = time.monotonic()
+        return bool(self.records)
+
+    def read(self, negative=False):
+        if self._index >= len(self.records):
+            if not self.loop:
+                return None
+            self._index = 0
+            self._start = time.monotonic()
+        record = self.records[self._index]
+        self.timestamp = record[0]
+        self._index += 1
+        if self.realtime:
+            # pace frames the way the camera delivered them
+            delay = self._start + record[0] - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        frame = self._frame.view(_ReplayFrame)
+        frame.record = record
+        return frame
+
+    def release(self, frame):
+        pass
+
+    def displayFrame(self, frame):
+        return frame
+
+    def warmup(self):
+        pass
+
+    def loadCalibration(self):
+        # a recording is made after calibration, which the header carries
+        return True
+
+    def initializeHandDetection(self, frame):
+        return True
+
+    def handDetection(self, frame, timestamp=None):
+        # the log's own timestamps, not the replay's, drive the gesture filter
+        t, hands = frame.record[:2]
+        result = self.decoder.decodeHands(hands, t)
+        self.adjust_mode = self.decoder.adjust_mode
+        return (frame,) + result
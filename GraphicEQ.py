@@ -0,0 +1,121 @@
+import numpy as np
+
+from ParametricEQ import BiquadCascade
+
+
+# band gain used to measure how far one band spills onto its neighbours
+PROTOTYPE_DB = 12.0
+
+
+def band_centers(n_bands, low=25.0, high=16000.0):
+    # log-spaced: 10 bands are about an octave apart, 31 about a third
+    return np.geomspace(low, high, n_bands)
+
+
+def peaking_response_db(sos, fs, freqs):
+    # magnitude of each (bands, 6) biquad at `freqs`, as (bands, freqs) dB
+    z = np.exp(-2j * np.pi * np.asarray(freqs, dtype=np.float64) / fs)
+    num = sos[:, 0, None] + sos[:, 1, None] * z + sos[:, 2, None] * z * z
+    den = sos[:, 3, None] + sos[:, 4, None] * z + sos[:, 5, None] * z * z
+    return 20 * np.log10(np.abs(num / den))
+
+
+def peaking_sos(fs, f0, q, gain_db):
+    # RBJ peaking biquads for arrays of bands at once, as (bands, 6)
+    A = 10 ** (np.asarray(gain_db, dtype=np.float64) / 40.0)
+    w0 = 2 * np.pi * np.clip(f0, 1.0, 0.49 * fs) / fs
+    alpha = np.sin(w0) / (2 * np.asarray(q))
+    cos_w0 = np.cos(w0)
+    a0 = 1 + alpha / A
+    sos = np.stack(np.broadcast_arrays(
+        1 + alpha * A, -2 * cos_w0, 1 - alpha * A, a0, -2 * cos_w0, 1 - alpha / A), axis=-1)
+    return sos / a0[..., None]
+
+
+class BandRegions:
+    # ParametricEQ's low/mid/high interface for engines with N fixed bands:
+    # bands below low_cut follow the low gain, above high_cut the high gain,
+    # the rest the mid gain. Moving a cutoff re-applies the last low/mid/high
+    # gains, replacing per-band edits made since
+    low_cut = 300.0
+    high_cut = 10000.0
+    region_db = (0.0, 0.0, 0.0)
+
+    def set_bands(self, low_cut, mid_center, mid_bandwidth, high_cut):
+        self.low_cut = low_cut
+        self.high_cut = high_cut
+        self.set_band_gains(self._region_gains(*self.region_db))
+
+    def set_gains(self, low_db=0.0, mid_db=0.0, high_db=0.0):
+        self.region_db = (low_db, mid_db, high_db)
+        self.set_band_gains(self._region_gains(low_db, mid_db, high_db))
+
+    def _region_gains(self, low_db, mid_db, high_db):
+        return np.where(self.centers < self.low_cut, low_db,
+                        np.where(self.centers > self.high_cut, high_db, mid_db))
+
+    def set_band_gain(self, index, gain_db):
+        gains_db = self.gains_db.copy()
+        gains_db[index] = gain_db
+        self.set_band_gains(gains_db)
+
+
+class GraphicEQ(BandRegions, BiquadCascade):
+    # N peaking bands in one cascade, addressed by index
+    def __init__(self, fs, centers=None, n_bands=10, q=None, sections=1,
+                 ramp_samples=0, sub_block=64, channels=1):
+        self.centers = np.asarray(band_centers(n_bands) if centers is None else centers,
+                                  dtype=np.float64)
+        self.n_bands = len(self.centers)
+        if q is None:
+            # constant-Q bands as wide as the spacing between centers
+            spacing = np.log2(self.centers[-1] / self.centers[0]) / max(self.n_bands - 1, 1)
+            q = 2 ** (spacing / 2) / (2 ** spacing - 1)
+        self.q = np.broadcast_to(np.asarray(q, dtype=np.float64), (self.n_bands,)).copy()
+        # every band is `sections` identical peaking biquads sharing its gain
+        self.sections = sections
+        self.gains_db = np.zeros(self.n_bands)
+        # what the filters are set to; see set_band_gains
+        self.filter_db = np.zeros(self.n_bands)
+        self._interaction = None
+        super().__init__(fs, self.n_bands * sections, ramp_samples, sub_block, channels)
+
+    def set_band_gains(self, gains_db):
+        self.gains_db = np.broadcast_to(
+            np.asarray(gains_db, dtype=np.float64), (self.n_bands,)).copy()
+        # neighbouring bands overlap and their boosts add up: with every band
+        # at +6 dB the centers would read +9 to +10 dB. Solve for the filter
+        # gains whose summed response hits gains_db at the band centers, plus
+        # two correction steps since a band's shape changes with its gain
+        if self._interaction is None:
+            self._interaction = self._response_db(np.full(self.n_bands, PROTOTYPE_DB)).T
+            self._interaction /= PROTOTYPE_DB
+        filter_db = np.zeros(self.n_bands)
+        for _ in range(3):
+            error = self.gains_db - self._response_db(filter_db).sum(axis=0)
+            filter_db += np.linalg.lstsq(self._interaction, error, rcond=None)[0]
+        self.filter_db = filter_db
+        self._update()
+
+    def _response_db(self, filter_db):
+        # (bands, centers): each band's response at every band center
+        band = peaking_sos(self.fs, self.centers, self.q, filter_db / self.sections)
+        return self.sections * peaking_response_db(band, self.fs, self.centers)
+
+    def set_band(self, index, center=None, q=None):
+        if center is not None:
+            self.centers = self.centers.copy()
+            self.centers[index] = center
+        if q is not None:
+            self.q = self.q.copy()
+            self.q[index] = q
+        self._interaction = None
+        self.set_band_gains(self.gains_db)
+
+    def _update(self):
+        band = peaking_sos(self.fs, self.centers, self.q, self.filter_db / self.sections)
+        # (bands, sections, 6); `sos` views it as the one cascade sosfilt
+        # runs in a single call. A fresh array swapped in with one store
+        stacked = np.repeat(band[:, None, :], self.sections, axis=1)
+        self.stacked = stacked
+        self.sos = stacked.reshape(-1, 6)
@@ -0,0 +1,370 @@
+import json
+import math
+import multiprocessing
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import cv2
+import numpy as np
+
+from Camera import Camera
+
+# Wire format, both directions: a MESSAGE header (JSON length, payload
+# length), the JSON object, then the payload bytes (a JPEG frame or nothing).
+#
+# client -> server
+#   {"type": "hello", "session": name, "width": w, "height": h,
+#    "profile": name | "palm_size": p, "hand_range": [lo, hi]}
+#   {"type": "frame", "t": seconds} + JPEG payload
+#   {"type": "landmarks", "t": seconds, "hands": [{"type", "lmList", "center"}]}
+#   {"type": "subscribe", "session": name}
+# server -> client
+#   {"type": "gesture", "session": name, "t": seconds, "freq_band": band,
+#    "gain": g, "volume": v, "adjust_mode": bool}
+MESSAGE = struct.Struct("<II")
+DEFAULT_PORT = 8765
+
+
+def send_message(sock, message, payload=b""):
+    header = json.dumps(message).encode()
+    sock.sendall(MESSAGE.pack(len(header), len(payload)) + header + payload)
+
+
+def _recv_exactly(sock, n):
+    data = bytearray()
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        data += chunk
+    return bytes(data)
+
+
+def recv_message(sock):
+    header_len, payload_len = MESSAGE.unpack(_recv_exactly(sock, MESSAGE.size))
+    message = json.loads(_recv_exactly(sock, header_len))
+    return message, _recv_exactly(sock, payload_len) if payload_len else b""
+
+
+# -- worker processes: one HandDetector each, loaded once --
+
+_detector = None
+
+
+def _init_worker():
+    global _detector
+    from cvzone.HandTrackingModule import HandDetector
+    _detector = HandDetector(detectionCon=0.6, maxHands=2)
+
+
+def _detect_batch(batch):
+    # MediaPipe runs one image per call, so a batch is a list of frames
+    # from different sessions handled in one task: one round trip to the
+    # worker instead of one per frame
+    results = []
+    for name, t, jpeg in batch:
+        frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        # nobody sees the worker's copy of the frame, so nothing is drawn
+        hands = _detector.findHands(frame, draw=False)
+        results.append((name, t, [
+            {"type": hand["type"], "lmList": hand["lmList"], "center": hand["center"]}
+            for hand in hands]))
+    return results
+
+
+class Session:
+    def __init__(self, name, width=720, height=480, profile=None,
+                 palm_size=None, hand_range=None):
+        self.name = name
+        # a Camera that is never opened decodes landmarks and filters gestures
+        self.decoder = Camera(None, profile=profile or name)
+        self.decoder.width = width
+        self.decoder.height = height
+        if palm_size is not None and hand_range is not None:
+            self.decoder.palm_size = palm_size
+            self.decoder.right_hand_range = list(hand_range)
+            self.calibrated = True
+        else:
+            self.calibrated = self.decoder.loadCalibration()
+        self.subscribers = []
+        self.last_result = None
+        self.in_flight = False
+        self.frames = 0
+
+
+class HandServer:
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, workers=None):
+        self.address = (host, port)
+        self.workers = workers or os.cpu_count()
+        # spawned, not forked: the server already runs threads
+        self.pool = ProcessPoolExecutor(
+            self.workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker)
+        self.sessions = {}
+        self.events = 0
+        # newest unprocessed frame per session; older ones are dropped
+        self._pending = {}
+        self._batches = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._threads = []
+        self._sock = None
+
+    def session(self, name, **calibration):
+        with self._cond:
+            if name not in self.sessions or calibration:
+                old = self.sessions.get(name)
+                self.sessions[name] = Session(name, **calibration)
+                if old is not None:
+                    self.sessions[name].subscribers = old.subscribers
+            return self.sessions[name]
+
+    def start(self):
+        self._running = True
+        self._sock = socket.create_server(self.address)
+        self.address = self._sock.getsockname()
+        for target in (self._accept, self._dispatch):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        self._sock.close()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self.pool.shutdown(cancel_futures=True)
+
+    def add_camera(self, index, name=None, profile=None, quality=80):
+        # a camera attached to this machine, fed to the pool like a client's frames
+        name = name or f"cam{index}"
+        camera = Camera(index)
+        if not camera.open():
+            raise RuntimeError(f"failed to open camera {index}")
+        self.session(name, width=camera.width, height=camera.height, profile=profile)
+
+        def capture():
+            while self._running:
+                frame = camera.read()
+                if frame is None:
+                    time.sleep(0.01)
+                    continue
+                t = time.perf_counter()
+                ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+                camera.release(frame)
+                if ok:
+                    self.submit_frame(name, t, jpeg.tobytes())
+            camera.vc.release()
+
+        thread = threading.Thread(target=capture, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def submit_frame(self, name, t, jpeg):
+        with self._cond:
+            self._pending[name] = (t, jpeg)
+            self._cond.notify()
+
+    def submit_landmarks(self, name, t, hands):
+        # no inference needed; decode right away
+        self._decoded(self.sessions[name], t, hands)
+
+    def _dispatch(self):
+        while self._running:
+            with self._cond:
+                # one frame in flight per session keeps its results in order,
+                # and at most one batch per worker keeps the queue short
+                ready = [name for name in self._pending if not self.sessions[name].in_flight]
+                if not ready or self._batches >= self.workers:
+                    self._cond.wait(0.1)
+                    continue
+                # spread the ready sessions over the idle workers
+                size = math.ceil(len(ready) / (self.workers - self._batches))
+                batch = []
+                for name in ready[:size]:
+                    t, jpeg = self._pending.pop(name)
+                    self.sessions[name].in_flight = True
+                    batch.append((name, t, jpeg))
+                self._batches += 1
+            try:
+                future = self.pool.submit(_detect_batch, batch)
+            except BrokenProcessPool:
+                # the detector failed to load; landmark sessions still work
+                print("hand detector workers failed to start; frames are dropped")
+                return
+            future.add_done_callback(self._batch_done)
+
+    def _batch_done(self, future):
+        try:
+            results = future.result()
+        except Exception:
+            results = []
+        with self._cond:
+            self._batches -= 1
+            for name, _, _ in results:
+                self.sessions[name].in_flight = False
+            if future.exception() is not None:
+                # a worker failed; let every session submit again
+                for session in self.sessions.values():
+                    session.in_flight = False
+            self._cond.notify()
+        for name, t, hands in results:
+            self._decoded(self.sessions[name], t, hands)
+
+    def _decoded(self, session, t, hands):
+        session.frames += 1
+        if not session.calibrated:
+            return
+        result = session.decoder.decodeHands(hands, t)
+        # only changes go out, as in HandTracker
+        if result == session.last_result:
+            return
+        session.last_result = result
+        freq_band, gain, volume, adjust_mode = result
+        self.publish(session, {
+            "type": "gesture", "session": session.name, "t": t, "freq_band": freq_band,
+            "gain": float(gain), "volume": float(volume), "adjust_mode": bool(adjust_mode)})
+
+    def publish(self, session, event):
+        # never blocks: runs on the pool's callback thread, shared by all sessions
+        self.events += 1
+        for client in session.subscribers:
+            if not client.send(event):
+                self._unsubscribe(client)
+
+    def _subscribe(self, name, client):
+        # subscriber lists are replaced, never changed in place, so publish
+        # can walk one while a connection thread adds or drops a client
+        with self._cond:
+            session = self.session(name)
+            session.subscribers = session.subscribers + [client]
+
+    def _unsubscribe(self, client):
+        with self._cond:
+            for session in self.sessions.values():
+                if client in session.subscribers:
+                    session.subscribers = [c for c in session.subscribers if c is not client]
+
+    def _accept(self):
+        while self._running:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                break
+            thread = threading.Thread(target=self._serve, args=(_Client(conn),), daemon=True)
+            thread.start()
+
+    def _serve(self, client):
+        session = None
+        try:
+            while self._running:
+                message, payload = client.recv()
+                kind = message["type"]
+                if kind == "hello":
+                    calibration = {key: message[key] for key in (
+                        "width", "height", "profile", "palm_size", "hand_range")
+                        if key in message}
+                    # a station only sends; it subscribes like anyone else
+                    session = self.session(message["session"], **calibration)
+                elif kind == "subscribe":
+                    self._subscribe(message["session"], client)
+                elif kind == "frame" and session is not None:
+                    self.submit_frame(session.name, message["t"], payload)
+                elif kind == "landmarks" and session is not None:
+                    self.submit_landmarks(session.name, message["t"], message["hands"])
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            self._unsubscribe(client)
+            client.close()
+
+
+class _Client:
+    # one connection on the server side. Events are queued and written by
+    # the client's own thread; one that falls `max_queued` events behind
+    # is disconnected rather than allowed to stall the server
+    def __init__(self, conn, max_queued=256):
+        self.conn = conn
+        self.closed = False
+        self._queue = queue.Queue(max_queued)
+        self._writer = threading.Thread(target=self._write, daemon=True)
+        self._writer.start()
+
+    def send(self, message):
+        if not self.closed:
+            try:
+                self._queue.put_nowait(message)
+            except queue.Full:
+                self.close()
+        return not self.closed
+
+    def _write(self):
+        try:
+            while not self.closed:
+                message = self._queue.get()
+                if message is None:
+                    break
+                send_message(self.conn, message)
+        except OSError:
+            self.close()
+        finally:
+            # the writer owns the socket, so it is never closed mid-send
+            self.conn.close()
+
+    def recv(self):
+        return recv_message(self.conn)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        # wakes the writer if it is waiting for an event
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        try:
+            # unblocks a reader or writer stuck in the socket
+            self.conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class HandClient:
+    # a station: sends its frames or landmarks, or only listens for events
+    def __init__(self, session, host="127.0.0.1", port=DEFAULT_PORT, **hello):
+        self.session = session
+        self.sock = socket.create_connection((host, port))
+        if hello:
+            send_message(self.sock, dict(type="hello", session=session, **hello))
+        else:
+            send_message(self.sock, {"type": "subscribe", "session": session})
+
+    def send_frame(self, frame, t=None, quality=80):
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if ok:
+            send_message(self.sock, {"type": "frame", "t": time.perf_counter() if t is None else t},
+                         jpeg.tobytes())
+
+    def send_landmarks(self, hands, t=None):
+        send_message(self.sock, {"type": "landmarks", "t": time.perf_counter() if t is None else t,
+                                 "hands": hands})
+
+    def events(self):
+        while True:
+            try:
+                message, _ = recv_message(self.sock)
+            except (ConnectionError, OSError):
+                return
+            if message.get("type") == "gesture":
+                yield message
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,115 @@
+import threading
+import time
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from Tracer import tracer
+
+
+class LatestFrame:
+    def __init__(self, on_drop=None):
+        self._cond = threading.Condition()
+        self._item = None
+        self.on_drop = on_drop
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._item is not None:
+                # the consumer never got to the previous frame; it is stale now
+                self.dropped += 1
+                if self.on_drop:
+                    self.on_drop(self._item)
+            self._item = item
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        with self._cond:
+            if self._item is None:
+                self._cond.wait(timeout)
+            item, self._item = self._item, None
+            return item
+
+
+class HandTracker(QObject):
+    # a new frame waits in latestFrame(); at most one of these is queued
+    frameReady = pyqtSignal()
+    calibrated = pyqtSignal()
+    # freq_band, gain, volume, adjust_mode and the trace stamps of the frame
+    # behind the result: (capture ns, emit ns, frame number)
+    gestureDetected = pyqtSignal(str, float, float, bool, object)
+
+    def __init__(self, camera):
+        super().__init__()
+        self.camera = camera
+        self.calibrating = True
+        self.detecting = False
+        self.running = False
+        self._frames = LatestFrame(on_drop=lambda item: camera.release(item[1]))
+        # latest-wins handoff to the GUI: a frame the GUI has not painted yet
+        # is released when a newer one replaces it
+        self._display = LatestFrame(on_drop=camera.release)
+        self._paint_pending = False
+        self._threads = []
+        self.frame_count = 0
+        # only results that differ from the last one sent are emitted
+        self._last_result = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._threads = [
+            threading.Thread(target=self._capture, daemon=True),
+            threading.Thread(target=self._infer, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self.running = False
+        self._frames.put(None)
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+        frame = self.latestFrame()
+        if frame is not None:
+            self.camera.release(frame)
+
+    def latestFrame(self):
+        # GUI thread: the newest display frame, or None if it was taken already
+        self._paint_pending = False
+        return self._display.get(timeout=0)
+
+    def _capture(self):
+        while self.running:
+            frame = self.camera.read()
+            if frame is None:
+                time.sleep(0.01)
+                continue
+            self._frames.put((tracer.now(), frame))
+
+    def _infer(self):
+        while self.running:
+            item = self._frames.get(timeout=0.1)
+            if item is None:
+                continue
+            captured, frame = item
+            self.frame_count += 1
+            if self.calibrating:
+                if self.camera.initializeHandDetection(frame):
+                    self.calibrating = False
+                    self.calibrated.emit()
+            elif self.detecting:
+                frame, freq_band, gain, volume, adjust_mode = self.camera.handDetection(
+                    frame, captured / 1e9)
+                result = (freq_band, float(gain), float(volume), adjust_mode)
+                if result != self._last_result:
+                    self._last_result = result
+                    self.gestureDetected.emit(
+                        *result, (captured, tracer.now(), self.frame_count))
+            else:
+                self._last_result = None
+            self._display.put(self.camera.displayFrame(frame))
+            if not self._paint_pending:
+                self._paint_pending = True
+                self.frameReady.emit()
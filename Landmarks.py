@@ -0,0 +1,60 @@
+import numpy as np
+
+# Landmark math on (hands, 21, 3) arrays. Every function also takes any
+# leading shape, e.g. (frames, hands, 21, 3), so recorded landmark streams
+# can be decoded in one call.
+
+FINGER_BITS = 1 << np.arange(5)  # thumb is bit 0, pinky bit 4
+# each finger tip and the joint it is compared against
+TIPS = [4, 8, 12, 16, 20]
+JOINTS = [3, 6, 10, 14, 18]
+# point pairs for thumb-index distance, palm size and the volume angle
+MEASURE_POINTS = [4, 8, 5, 0, 0, 12]
+
+
+def landmark_array(hands):
+    return np.array([hand["lmList"] for hand in hands], dtype=np.float64).reshape(-1, 21, 3)
+
+
+def fingers_up(landmarks, right):
+    # cvzone's rule: a finger is up when its tip is above its PIP joint, the
+    # thumb when its tip is outside the joint below it (mirrored between hands)
+    delta = landmarks[..., JOINTS, :2] - landmarks[..., TIPS, :2]
+    up = delta[..., 1] > 0
+    up[..., 0] = delta[..., 0, 0] * (1 - 2 * np.asarray(right)) > 0
+    return up
+
+
+def finger_codes(landmarks, right):
+    return fingers_up(landmarks, right) @ FINGER_BITS
+
+
+def gesture_table(gestures):
+    # every 5-bit finger code -> index into names; 0 is "none"
+    names = ["none"] + list(gestures)
+    table = np.zeros(1 << 5, dtype=np.intp)
+    for i, fingers in enumerate(gestures.values(), 1):
+        table[np.dot(fingers, FINGER_BITS)] = i
+    return names, table
+
+
+def measure(landmarks):
+    # thumb-index distance, palm size (wrist to index base) and the
+    # wrist -> middle tip angle in degrees
+    points = landmarks[..., MEASURE_POINTS, :2]
+    d = points[..., 1::2, :] - points[..., 0::2, :]
+    lengths = np.hypot(d[..., :2, 0], d[..., :2, 1])
+    angle = np.degrees(np.arctan2(d[..., 2, 1], d[..., 2, 0]))
+    return lengths[..., 0], lengths[..., 1], angle
+
+
+def volume_from_angle(angle, initial_angle, volume_range):
+    low, high = volume_range
+    return (np.clip(-angle - initial_angle, low, high) - low) / (high - low)
+
+
+def gain_from_distance(distance, palm, palm_size, hand_range, eq_range):
+    # the calibrated range is scaled by how far the hand is from the camera
+    scale = palm / palm_size
+    low, high = hand_range[0] * scale, hand_range[1] * scale
+    return eq_range[0] + (distance - low) * (eq_range[1] - eq_range[0]) / (high - low)
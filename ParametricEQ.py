@@ -0,0 +1,127 @@
+import numpy as np
+from scipy import signal
+
+
+def _clip_freq(fs, f0):
+    return float(np.clip(f0, 1.0, 0.49 * fs))
+
+
+def low_shelf(fs, f0, gain_db, q=1/np.sqrt(2)):
+    A = 10 ** (gain_db / 40.0)
+    w0 = 2 * np.pi * _clip_freq(fs, f0) / fs
+    alpha = np.sin(w0) / (2 * q)
+    cos_w0 = np.cos(w0)
+    sqrt_a = 2 * np.sqrt(A) * alpha
+    b = [A * ((A + 1) - (A - 1) * cos_w0 + sqrt_a),
+         2 * A * ((A - 1) - (A + 1) * cos_w0),
+         A * ((A + 1) - (A - 1) * cos_w0 - sqrt_a)]
+    a = [(A + 1) + (A - 1) * cos_w0 + sqrt_a,
+         -2 * ((A - 1) + (A + 1) * cos_w0),
+         (A + 1) + (A - 1) * cos_w0 - sqrt_a]
+    return np.concatenate((b, a)) / a[0]
+
+
+def high_shelf(fs, f0, gain_db, q=1/np.sqrt(2)):
+    A = 10 ** (gain_db / 40.0)
+    w0 = 2 * np.pi * _clip_freq(fs, f0) / fs
+    alpha = np.sin(w0) / (2 * q)
+    cos_w0 = np.cos(w0)
+    sqrt_a = 2 * np.sqrt(A) * alpha
+    b = [A * ((A + 1) + (A - 1) * cos_w0 + sqrt_a),
+         -2 * A * ((A - 1) + (A + 1) * cos_w0),
+         A * ((A + 1) + (A - 1) * cos_w0 - sqrt_a)]
+    a = [(A + 1) - (A - 1) * cos_w0 + sqrt_a,
+         2 * ((A - 1) - (A + 1) * cos_w0),
+         (A + 1) - (A - 1) * cos_w0 - sqrt_a]
+    return np.concatenate((b, a)) / a[0]
+
+
+def peaking(fs, f0, q, gain_db):
+    A = 10 ** (gain_db / 40.0)
+    w0 = 2 * np.pi * _clip_freq(fs, f0) / fs
+    alpha = np.sin(w0) / (2 * q)
+    cos_w0 = np.cos(w0)
+    b = [1 + alpha * A, -2 * cos_w0, 1 - alpha * A]
+    a = [1 + alpha / A, -2 * cos_w0, 1 - alpha / A]
+    return np.concatenate((b, a)) / a[0]
+
+
+class BiquadCascade:
+    # biquads run as one cascaded SOS chain; subclasses build `sos` in
+    # _update(). Coefficient changes are interpolated over `ramp_samples`,
+    # updated every `sub_block` samples
+    def __init__(self, fs, n_sections, ramp_samples=0, sub_block=64, channels=1):
+        self.fs = fs
+        self.ramp_samples = ramp_samples
+        self.sub_block = sub_block
+        self.zi = np.zeros((n_sections, 2, channels))
+        self._update()
+        self._applied = self.sos
+        self._start = self.sos
+        self._target = self.sos
+        self._ramp_pos = ramp_samples
+
+    def _update(self):
+        raise NotImplementedError
+
+    def reset(self):
+        self.zi.fill(0.0)
+
+    def process(self, x, sos=None):
+        sos = self.sos if sos is None else sos
+        if sos is not self._target:
+            self._start = self._applied
+            self._target = sos
+            self._ramp_pos = 0
+        if self._ramp_pos >= self.ramp_samples:
+            self._applied = sos
+            y, self.zi = signal.sosfilt(sos, x, axis=0, zi=self.zi)
+            return y
+
+        # Linear interpolation between two stable biquads stays stable (the
+        # second-order stability region is convex), so the coefficients can
+        # be blended directly instead of re-running the design.
+        y = np.empty(x.shape)
+        for start in range(0, len(x), self.sub_block):
+            stop = min(start + self.sub_block, len(x))
+            if self._ramp_pos < self.ramp_samples:
+                self._ramp_pos = min(self.ramp_samples, self._ramp_pos + stop - start)
+                frac = self._ramp_pos / self.ramp_samples
+                self._applied = self._start + (sos - self._start) * frac
+            y[start:stop], self.zi = signal.sosfilt(
+                self._applied, x[start:stop], axis=0, zi=self.zi)
+        return y
+
+
+class ParametricEQ(BiquadCascade):
+    def __init__(self, fs, low_cut=300.0, mid_center=2000.0, mid_bandwidth=800.0,
+                 high_cut=10000.0, ramp_samples=0, sub_block=64, channels=1):
+        self.low_cut = low_cut
+        self.mid_center = mid_center
+        self.mid_bandwidth = mid_bandwidth
+        self.high_cut = high_cut
+        self.gains_db = [0.0, 0.0, 0.0]
+        # low shelf -> mid peak -> high shelf
+        super().__init__(fs, 3, ramp_samples, sub_block, channels)
+
+    def set_bands(self, low_cut, mid_center, mid_bandwidth, high_cut):
+        self.low_cut = low_cut
+        self.mid_center = mid_center
+        self.mid_bandwidth = mid_bandwidth
+        self.high_cut = high_cut
+        self._update()
+
+    def set_gains(self, low_db=0.0, mid_db=0.0, high_db=0.0):
+        self.gains_db = [low_db, mid_db, high_db]
+        self._update()
+
+    def _update(self):
+        low_db, mid_db, high_db = self.gains_db
+        q = self.mid_center / max(self.mid_bandwidth, 1.0)
+        # the gains live in the coefficients; zi is kept as-is. A fresh array
+        # is built and then swapped in, so readers never see a partial update
+        self.sos = np.vstack((
+            low_shelf(self.fs, self.low_cut, low_db),
+            peaking(self.fs, self.mid_center, q, mid_db),
+            high_shelf(self.fs, self.high_cut, high_db),
+        ))
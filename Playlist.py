@@ -0,0 +1,133 @@
+import collections
+import threading
+import numpy as np
+from pydub import AudioSegment
+
+from StreamDecoder import StreamDecoder
+
+
+class Track:
+    # one file at the player's rate and channel count: a memory-mapped cache
+    # hit, a streaming decode, or a full decode held in memory
+    def __init__(self, filename, fs, channels, streaming=False, cache=None):
+        self.filename = filename
+        self.fs = fs
+        self.channels = channels
+        self.position = 0
+        self.stream = None
+        self.samples = cache.get(filename, fs, channels) if cache else None
+        if self.samples is None and streaming:
+            # decode on a producer thread into a bounded ring buffer
+            writer = cache.writer(filename, fs, channels) if cache else None
+            self.stream = StreamDecoder(filename, fs, channels, cache_writer=writer)
+        elif self.samples is None:
+            audio = AudioSegment.from_file(filename).set_channels(channels).set_frame_rate(fs)
+            self.samples = np.array(audio.get_array_of_samples()).astype(
+                np.float32).reshape(-1, channels) / 32768.0
+            if cache:
+                self.samples = cache.put(filename, fs, self.samples)
+
+    def read(self, out):
+        if self.stream is not None:
+            n = self.stream.read(out)
+        else:
+            chunk = self.samples[self.position:self.position + len(out)]
+            n = len(chunk)
+            out[:n] = chunk
+            out[n:] = 0.0
+        self.position += n
+        return n
+
+    def exhausted(self):
+        if self.stream is not None:
+            return self.stream.exhausted()
+        return self.position >= len(self.samples)
+
+    def remaining(self):
+        # frames left, once that is known
+        if self.stream is not None:
+            return self.stream.ring.available() if self.stream.finished else None
+        return len(self.samples) - self.position
+
+    def duration(self):
+        if self.samples is not None:
+            return len(self.samples) / self.fs
+        return None
+
+    def seek(self, frame):
+        # restarts a streaming decode at the new offset; the caller moves
+        # `position` on the audio thread
+        if self.samples is not None:
+            return min(frame, len(self.samples))
+        self.stream.seek(frame / self.fs)
+        return frame
+
+    def wait_ready(self, frames):
+        if self.stream is not None:
+            self.stream.wait_ready(frames)
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+
+
+class Playlist:
+    def __init__(self, fs, channels, streaming=False, cache=None, preroll_frames=8192):
+        self.fs = fs
+        self.channels = channels
+        self.streaming = streaming
+        self.cache = cache
+        self.preroll_frames = preroll_frames
+        # files not opened yet; `ready` is the next track, already decoding.
+        # The audio thread only takes `ready` and hands back finished tracks,
+        # the loader thread does all opening, decoding and closing.
+        self.queue = collections.deque()
+        self.ready = None
+        self._retired = collections.deque()
+        self._wake = threading.Event()
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, filename):
+        self.queue.append(filename)
+        self._wake.set()
+
+    def pending(self):
+        return self.ready is not None or bool(self.queue)
+
+    def take(self):
+        # audio thread: never blocks, None when the next track is not ready
+        track = self.ready
+        if track is not None:
+            self.ready = None
+            self._wake.set()
+        return track
+
+    def retire(self, track):
+        # audio thread: closing a decoder waits on ffmpeg, so leave it to the loader
+        self._retired.append(track)
+        self._wake.set()
+
+    def _run(self):
+        while not self._closing:
+            self._wake.wait()
+            self._wake.clear()
+            while self._retired:
+                self._retired.popleft().close()
+            if self.ready is None and self.queue and not self._closing:
+                track = Track(self.queue.popleft(), self.fs, self.channels,
+                              self.streaming, self.cache)
+                track.wait_ready(self.preroll_frames)
+                self.ready = track
+
+    def close(self):
+        self._closing = True
+        self._wake.set()
+        self._thread.join(timeout=5.0)
+        for track in [self.ready] + list(self._retired):
+            if track is not None:
+                track.close()
+        self.ready = None
+        self._retired.clear()
+        self.queue.clear()
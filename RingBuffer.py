@@ -0,0 +1,38 @@
+import numpy as np
+
+
+class RingBuffer:
+    def __init__(self, capacity, shape=(), dtype=np.float32):
+        self.capacity = capacity
+        self._buf = np.zeros((capacity,) + tuple(shape), dtype=dtype)
+        # monotonic frame counters; each side only ever writes its own,
+        # so one producer and one consumer can share the buffer without a lock
+        self._written = 0
+        self._read = 0
+
+    def available(self):
+        return self._written - self._read
+
+    def space(self):
+        return self.capacity - self.available()
+
+    def write(self, data):
+        n = min(len(data), self.space())
+        start = self._written % self.capacity
+        first = min(n, self.capacity - start)
+        self._buf[start:start + first] = data[:first]
+        self._buf[:n - first] = data[first:n]
+        self._written += n
+        return n
+
+    def read(self, out):
+        n = min(len(out), self.available())
+        start = self._read % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self._buf[start:start + first]
+        out[first:n] = self._buf[:n - first]
+        self._read += n
+        return n
+
+    def clear(self):
+        self._read = self._written
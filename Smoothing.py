@@ -0,0 +1,29 @@
+import numpy as np
+
+
+class LinearRamp:
+    def __init__(self, value, ramp_samples):
+        self.value = np.atleast_1d(np.asarray(value, dtype=np.float64)).copy()
+        self.ramp_samples = max(1, int(ramp_samples))
+        self._target = self.value.copy()
+        self._step = np.zeros_like(self.value)
+        self._remaining = 0
+
+    def next(self, target, n):
+        # returns per-sample values shaped (k, n) while ramping and (k, 1)
+        # once settled; both broadcast against a (k, n) block
+        target = np.atleast_1d(np.asarray(target, dtype=np.float64))
+        if not np.array_equal(target, self._target):
+            self._target = target
+            self._remaining = self.ramp_samples
+            self._step = (target - self.value) / self.ramp_samples
+        if self._remaining == 0:
+            return self.value[:, None]
+
+        m = min(n, self._remaining)
+        ramp = np.empty((len(self.value), n))
+        ramp[:, :m] = self.value[:, None] + self._step[:, None] * np.arange(1, m + 1)
+        self._remaining -= m
+        self.value = self._target.copy() if self._remaining == 0 else ramp[:, m - 1].copy()
+        ramp[:, m:] = self.value[:, None]
+        return ramp
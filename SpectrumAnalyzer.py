@@ -0,0 +1,108 @@
+from collections import namedtuple
+import threading
+import time
+import numpy as np
+from PyQt6.QtCore import QObject, pyqtSignal
+
+# One analysis result per UI tick. `spectrum` is in dB per display band,
+# `peak` and `rms` in dBFS per channel, `reduction` the deepest limiter
+# gain reduction (dB) since the previous tick.
+Meter = namedtuple("Meter", ["freqs", "spectrum", "peak", "rms", "reduction"])
+
+FLOOR_DB = -120.0
+
+
+def _db(x):
+    return 20 * np.log10(np.maximum(x, 10 ** (FLOOR_DB / 20)))
+
+
+class SpectrumAnalyzer(QObject):
+    updated = pyqtSignal(object)
+
+    def __init__(self, rate=30.0, fft_size=4096, bands=48, averaging=0.6,
+                 low=25.0, high=16000.0):
+        super().__init__()
+        self.rate = rate
+        self.fft_size = fft_size
+        # exponential averaging of the power spectrum between ticks
+        self.averaging = averaging
+        self.edges = np.geomspace(low, high, bands + 1)
+        self.freqs = np.sqrt(self.edges[:-1] * self.edges[1:])
+        self._window = np.hanning(fft_size)
+        self._scale = 2.0 / self._window.sum()
+        self._player = None
+        self._thread = None
+        self.running = False
+
+    def attach(self, player):
+        # the player's callback fills player.meter_ring; None detaches
+        self._player = player
+        self._history = None
+        self._power = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def _run(self):
+        period = 1.0 / self.rate
+        next_tick = time.monotonic()
+        while self.running:
+            next_tick += period
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()
+            player = self._player
+            if player is not None:
+                meter = self.analyze(player)
+                if meter is not None:
+                    self.updated.emit(meter)
+
+    def analyze(self, player):
+        ring = player.meter_ring
+        n = ring.available()
+        if not n:
+            return None
+        # everything written since the last tick; older data is dropped by
+        # the callback if this thread falls behind
+        block = np.empty((n, player.channels), dtype=np.float32)
+        ring.read(block)
+        if self._history is None or self._history.shape[1] != block.shape[1]:
+            self._history = np.zeros((self.fft_size, block.shape[1]), dtype=np.float32)
+            self._power = None
+        keep = min(n, self.fft_size)
+        self._history = np.concatenate((self._history[keep:], block[-keep:]))
+
+        peak = _db(np.abs(block).max(axis=0))
+        rms = _db(np.sqrt(np.mean(np.square(block, dtype=np.float64), axis=0)))
+
+        spectrum = np.fft.rfft(self._history.mean(axis=1) * self._window)
+        power = np.square(np.abs(spectrum) * self._scale)
+        if self._power is None:
+            self._power = power
+        else:
+            self._power = self.averaging * self._power + (1 - self.averaging) * power
+        # sum the FFT bins into log-spaced display bands; bands narrower
+        # than a bin show the bin they fall in
+        bins = np.searchsorted(np.fft.rfftfreq(self.fft_size, 1.0 / player.fs), self.edges)
+        bins = np.clip(bins, 1, len(power) - 1)
+        total = np.concatenate(([0.0], np.cumsum(self._power)))
+        bands = np.where(bins[1:] > bins[:-1], total[bins[1:]] - total[bins[:-1]],
+                         self._power[bins[:-1]])
+        spectrum_db = 10 * np.log10(np.maximum(bands, 10 ** (FLOOR_DB / 10)))
+
+        eq = player.eq_controller
+        reduction = eq.gain_reduction_db
+        eq.gain_reduction_db = 0.0
+        return Meter(self.freqs, spectrum_db, peak, rms, reduction)
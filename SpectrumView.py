@@ -0,0 +1,55 @@
+import numpy as np
+from PyQt6.QtCore import QRectF, Qt
+from PyQt6.QtGui import QColor, QPainter
+from PyQt6.QtWidgets import QWidget
+
+
+class SpectrumView(QWidget):
+    # spectrum bars plus peak/RMS meters, painted from the latest Meter
+    RANGE_DB = (-90.0, 0.0)
+    BACKGROUND = QColor("#E3D5CA")
+    BAR = QColor("#9A8C98")
+    PEAK = QColor("#4A4E69")
+    CLIP = QColor("#C9184A")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumSize(240, 150)
+        self.meter = None
+
+    def setMeter(self, meter):
+        self.meter = meter
+        self.update()
+
+    def _level(self, db):
+        low, high = self.RANGE_DB
+        return float(np.clip((db - low) / (high - low), 0.0, 1.0))
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.BACKGROUND)
+        if self.meter is None:
+            return
+        w, h = self.width(), self.height()
+        meters_w = 12 * (len(self.meter.peak) + 1)
+        text_h = 16
+        plot_w, plot_h = w - meters_w, h - text_h
+
+        bars = self.meter.spectrum
+        bar_w = plot_w / len(bars)
+        for i, db in enumerate(bars):
+            bar_h = self._level(db) * plot_h
+            painter.fillRect(QRectF(i * bar_w, plot_h - bar_h, bar_w - 1, bar_h), self.BAR)
+
+        # one RMS bar per channel with a peak tick above it
+        for c, (peak, rms) in enumerate(zip(self.meter.peak, self.meter.rms)):
+            x = plot_w + 6 + 12 * c
+            rms_h = self._level(rms) * plot_h
+            painter.fillRect(QRectF(x, plot_h - rms_h, 8, rms_h), self.PEAK)
+            peak_y = plot_h - self._level(peak) * plot_h
+            painter.fillRect(QRectF(x, peak_y, 8, 2), self.CLIP if peak >= -0.1 else self.PEAK)
+
+        painter.setPen(self.PEAK)
+        painter.drawText(QRectF(0, plot_h, w, text_h), Qt.AlignmentFlag.AlignLeft,
+                         f"peak {max(self.meter.peak):6.1f} dB   "
+                         f"limiter {-self.meter.reduction:5.1f} dB")
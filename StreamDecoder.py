@@ -0,0 +1,115 @@
+import subprocess
+import threading
+import time
+import numpy as np
+from pydub import AudioSegment
+from pydub.utils import mediainfo
+
+from RingBuffer import RingBuffer
+
+
+def probe(filename):
+    # native (sample rate, channels) of a file, so EQ and stream can match it
+    info = mediainfo(filename)
+    return int(info.get("sample_rate", 44100)), int(info.get("channels", 1))
+
+
+class _Session:
+    # one ffmpeg process, producer thread and ring, started at a given offset
+    def __init__(self, decoder, offset, cache_writer):
+        self.ring = RingBuffer(decoder.buffer_frames, shape=(decoder.channels,))
+        self.finished = False
+        self.stop = threading.Event()
+        self.cache_writer = cache_writer
+        # pydub's configured converter, so both paths use the same ffmpeg
+        self.process = subprocess.Popen(
+            [AudioSegment.converter, "-v", "quiet", "-ss", f"{offset:.6f}", "-i", decoder.filename,
+             "-f", "f32le", "-acodec", "pcm_f32le", "-ac", str(decoder.channels),
+             "-ar", str(decoder.fs), "-"],
+            stdout=subprocess.PIPE, stdin=subprocess.DEVNULL)
+        self.thread = threading.Thread(
+            target=self._produce, args=(decoder,), daemon=True)
+        self.thread.start()
+
+    def _produce(self, decoder):
+        frame_bytes = 4 * decoder.channels
+        raw = bytearray(decoder.chunk_frames * frame_bytes)
+        chunk = np.frombuffer(raw, dtype=np.float32).reshape(-1, decoder.channels)
+        wait = decoder.chunk_frames / decoder.fs / 4
+        complete = False
+        try:
+            while not self.stop.is_set():
+                nbytes = self.process.stdout.readinto(raw)
+                if not nbytes:
+                    complete = self.process.wait() == 0
+                    break
+                frames = nbytes // frame_bytes
+                if self.cache_writer is not None:
+                    self.cache_writer.write(chunk[:frames])
+                done = 0
+                while done < frames and not self.stop.is_set():
+                    done += self.ring.write(chunk[done:frames])
+                    if done < frames:
+                        time.sleep(wait)
+        finally:
+            try:
+                if self.cache_writer is not None:
+                    if complete:
+                        self.cache_writer.commit()
+                    else:
+                        self.cache_writer.abort()
+            finally:
+                # a failed cache write must not keep the track from ending
+                self.finished = True
+
+    def close(self):
+        self.stop.set()
+        if self.process.poll() is None:
+            self.process.kill()
+        self.thread.join(timeout=1.0)
+        self.process.stdout.close()
+
+
+class StreamDecoder:
+    def __init__(self, filename, fs=44100, channels=1, buffer_seconds=4.0, chunk_frames=4096,
+                 cache_writer=None):
+        self.filename = filename
+        self.fs = fs
+        self.channels = channels
+        self.chunk_frames = chunk_frames
+        self.buffer_frames = int(buffer_seconds * fs)
+        self._session = _Session(self, 0.0, cache_writer)
+
+    @property
+    def ring(self):
+        return self._session.ring
+
+    @property
+    def finished(self):
+        return self._session.finished
+
+    def seek(self, seconds):
+        # decode from the new offset in a fresh session and swap it in with a
+        # single reference store; the reader never sees a half-reset buffer.
+        # A partial decode is not cached, so the cache writer is dropped.
+        old = self._session
+        self._session = _Session(self, seconds, None)
+        old.close()
+
+    def wait_ready(self, frames, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while (self.ring.available() < frames and not self.finished
+               and time.monotonic() < deadline):
+            time.sleep(0.001)
+
+    def read(self, out):
+        n = self._session.ring.read(out)
+        out[n:] = 0.0
+        return n
+
+    def exhausted(self):
+        session = self._session
+        return session.finished and session.ring.available() == 0
+
+    def close(self):
+        self._session.close()
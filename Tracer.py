@@ -0,0 +1,106 @@
+import itertools
+import json
+import threading
+import time
+import numpy as np
+
+STAGES = [
+    "capture",     # Camera.read / vc.read()
+    "findHands",   # detector inference (or optical-flow tracking)
+    "decode",      # gesture decode in handDetection
+    "dispatch",    # inference thread emit -> GUI slot
+    "gesture",     # frame capture -> parameters applied on the GUI thread
+    "design",      # EQController filter design
+    "pickup",      # parameter publish -> first audio block that uses it
+    "callback",    # AudioPlayer.callback execution
+    "underflow",   # sounddevice reported an output underflow
+]
+
+EVENT = np.dtype([("stage", "u1"), ("thread", "u8"), ("start", "i8"),
+                  ("end", "i8"), ("frame", "i8")])
+
+
+class Tracer:
+    def __init__(self, capacity=1 << 16):
+        self.enabled = False
+        self.capacity = capacity
+        # preallocated ring of events; next() on a count is atomic in CPython,
+        # so threads never get the same slot
+        self._events = np.zeros(capacity, dtype=EVENT)
+        self._index = itertools.count()
+        self._written = 0
+        self._stage_ids = {name: i for i, name in enumerate(STAGES)}
+
+    @staticmethod
+    def now():
+        return time.perf_counter_ns()
+
+    def span(self, stage, start, frame=-1):
+        if not self.enabled:
+            return
+        i = next(self._index)
+        self._events[i % self.capacity] = (
+            self._stage_ids[stage], threading.get_ident(), start, time.perf_counter_ns(), frame)
+        self._written = i + 1
+
+    def mark(self, stage, frame=-1):
+        if self.enabled:
+            self.span(stage, time.perf_counter_ns(), frame)
+
+    def events(self):
+        events = self._events[:min(self._written, self.capacity)]
+        return events[np.argsort(events["start"], kind="stable")]
+
+    def clear(self):
+        self._index = itertools.count()
+        self._written = 0
+
+    def summary(self):
+        events = self.events()
+        stats = {}
+        for i, name in enumerate(STAGES):
+            durations = (events["end"] - events["start"])[events["stage"] == i] / 1e6
+            if not len(durations):
+                continue
+            stats[name] = {
+                "count": int(len(durations)),
+                "p50_ms": float(np.percentile(durations, 50)),
+                "p95_ms": float(np.percentile(durations, 95)),
+                "max_ms": float(durations.max()),
+            }
+        return stats
+
+    def summary_text(self):
+        lines = []
+        for name, s in self.summary().items():
+            if name == "underflow":
+                lines.append(f"{name:<10} {s['count']}")
+            else:
+                lines.append(f"{name:<10} {s['p50_ms']:7.2f} / {s['p95_ms']:7.2f} ms")
+        return "\n".join(lines)
+
+    def dump_json(self, path):
+        events = self.events()
+        with open(path, "w") as f:
+            json.dump({
+                "summary": self.summary(),
+                "events": [
+                    {"stage": STAGES[e["stage"]], "thread": int(e["thread"]),
+                     "start_ns": int(e["start"]), "end_ns": int(e["end"]),
+                     "frame": int(e["frame"])}
+                    for e in events],
+            }, f)
+
+    def dump_chrome(self, path):
+        # chrome://tracing / Perfetto "complete" events, microsecond timestamps
+        events = self.events()
+        trace = [
+            {"name": STAGES[e["stage"]], "ph": "X", "pid": 0, "tid": int(e["thread"]),
+             "ts": e["start"] / 1e3, "dur": (e["end"] - e["start"]) / 1e3,
+             "args": {"frame": int(e["frame"])}}
+            for e in events]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+
+
+tracer = Tracer()
@@ -0,0 +1,673 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import types
+import numpy as np
+
+from EqController import ENGINES, EQController
+
+FS = 44100
+BLOCK_SIZES = (64, 256, 1024, 4096)
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dsp_baseline.json")
+# gestures arrive at camera rate; automation changes the EQ this often
+CONTROL_RATE = 30.0
+# the block limiter must reproduce the per-sample loop to rounding error
+LIMITER_TOLERANCE = 1e-9
+
+
+def _test_signal(frames, fs=FS, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(frames) / fs
+    # music-like: loud bass line plus noise bursts that push past the threshold
+    x = 0.7 * np.sin(2 * np.pi * 80 * t) + 0.5 * rng.standard_normal(frames)
+    return x
+
+
+def _time_per_block(fn, x, block, repeat=3):
+    blocks = [x[i:i + block] for i in range(0, len(x) - block + 1, block)]
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for b in blocks:
+            fn(b)
+        best = min(best, (time.perf_counter() - start) / len(blocks))
+    return best
+
+
+class _SampleLimiter:
+    # the original per-sample limiter, kept as the reference for the block engine
+    def __init__(self, eq):
+        self.threshold = eq.limiter_threshold
+        self.attack = eq.attack_coeff
+        self.release = eq.release_coeff
+        self.gain = 1.0
+
+    def __call__(self, sample):
+        # instantaneous peak level
+        level = abs(sample)
+        if level > self.threshold:
+            target_gain = self.threshold / (level + 1e-15)
+        else:
+            target_gain = 1.0
+        # smooth gain: attack (downward) vs release (upward)
+        coeff = self.attack if target_gain < self.gain else self.release
+        self.gain = coeff * self.gain + (1 - coeff) * target_gain
+        return sample * self.gain
+
+
+def bench_limiter(block_sizes=BLOCK_SIZES, fs=FS, seconds=2.0):
+    x = _test_signal(int(fs * seconds), fs)
+    reference = _SampleLimiter(EQController(fs))
+    expected = np.array([reference(s) for s in x])
+    print("limiter: per-sample loop vs block engine")
+    print(f"{'block':>6} {'loop [ms]':>10} {'block [ms]':>11} {'speedup':>8} {'deadline':>9} "
+          f"{'max error':>10}")
+    for block in block_sizes:
+        limit_sample = _SampleLimiter(EQController(fs))
+        eq_block = EQController(fs)
+
+        def loop(b):
+            y = np.zeros_like(b)
+            for n, s in enumerate(b):
+                y[n] = limit_sample(s)
+            return y
+
+        # same gain curve as the loop, whatever the block size
+        check = EQController(fs)
+        frames = len(x) // block * block
+        y = np.concatenate([check._limit_block(x[i:i + block, None])[:, 0]
+                            for i in range(0, frames, block)])
+        error = np.abs(y - expected[:frames]).max()
+        assert error < LIMITER_TOLERANCE, f"block limiter differs from the loop by {error:.2e}"
+
+        t_loop = _time_per_block(loop, x, block, repeat=1)
+        t_block = _time_per_block(lambda b: eq_block._limit_block(b[:, None]), x, block)
+        deadline = block / fs
+        print(f"{block:>6} {t_loop * 1e3:>10.3f} {t_block * 1e3:>11.3f} "
+              f"{t_loop / t_block:>7.1f}x {t_block / deadline:>8.1%} {error:>10.1e}")
+
+
+def bench_engines(block_sizes=BLOCK_SIZES, fs=FS, seconds=2.0):
+    x = _test_signal(int(fs * seconds), fs)
+    print("EQ engines: three-band crossover vs fused parametric (limiter off)")
+    print(f"{'block':>6} {'crossover [ms]':>15} {'parametric [ms]':>16} {'speedup':>8}")
+    for block in block_sizes:
+        times = []
+        for engine in ("crossover", "parametric"):
+            eq = EQController(fs, engine=engine)
+            eq.set_gain(low_db=6.0, mid_db=-3.0, high_db=2.0)
+            eq.set_limiter(enabled=False)
+            times.append(_time_per_block(eq.process, x, block))
+        print(f"{block:>6} {times[0] * 1e3:>15.3f} {times[1] * 1e3:>16.3f} "
+              f"{times[0] / times[1]:>7.1f}x")
+
+
+def bench_bands(band_counts=(3, 5, 10, 15, 31), block=1024, fs=FS, seconds=2.0):
+    x = np.repeat(_test_signal(int(fs * seconds), fs)[:, None], 2, axis=1)
+    deadline = block / fs
+    print(f"N-band engines: cost per {block}-frame stereo block by band count (limiter off)")
+    print(f"{'bands':>6} {'graphic [ms]':>13} {'deadline':>9} {'fft [ms]':>9} {'deadline':>9}")
+    for bands in band_counts:
+        row = f"{bands:>6}"
+        for engine, width in (("graphic", 13), ("fft", 9)):
+            eq = EQController(fs, engine=engine, bands=bands, channels=2)
+            for i in range(bands):
+                eq.set_band_gain(i, 6.0 if i % 2 else -6.0)
+            eq.set_limiter(enabled=False)
+            t = _time_per_block(eq.process, x, block)
+            row += f" {t * 1e3:>{width}.3f} {t / deadline:>8.1%}"
+        print(row)
+
+
+def _transient_bytes(fn, frames):
+    tracemalloc.start()
+    peaks = []
+    for frame in frames:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn(frame)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    return np.median(peaks)
+
+
+def bench_frame_path(width=720, height=480, n_frames=50):
+    import cv2
+    from PyQt6.QtGui import QGuiApplication, QImage, QPixmap
+    from FramePool import FramePool
+
+    app = QGuiApplication.instance() or QGuiApplication([])
+    rng = np.random.default_rng(0)
+    captured = rng.integers(0, 255, (n_frames, height, width, 3), dtype=np.uint8)
+    pool = FramePool((height, width, 3))
+
+    def before(bgr):
+        # vc.read() result -> RGB copy -> negative copy -> QImage -> QPixmap
+        frame = bgr.copy()
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        frame = cv2.bitwise_not(frame)
+        image = QImage(frame, frame.shape[1], frame.shape[0], QImage.Format.Format_RGB888)
+        return QPixmap.fromImage(image)
+
+    def capture(bgr):
+        # inference thread: vc.read(buffer) fills a pooled frame, the negative
+        # runs in place and the RGB conversion writes another pooled buffer
+        frame = pool.acquire()
+        np.copyto(frame, bgr)
+        cv2.bitwise_not(frame, dst=frame)
+        rgb = pool.acquire()
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+        pool.release(frame)
+        return rgb
+
+    def show(rgb):
+        # GUI thread: wrap the RGB buffer, one copy into the pixmap
+        image = QImage(rgb.data, rgb.shape[1], rgb.shape[0], rgb.strides[0],
+                       QImage.Format.Format_RGB888)
+        pixmap = QPixmap.fromImage(image)
+        pool.release(rgb)
+        return pixmap
+
+    def after(bgr):
+        return show(capture(bgr))
+
+    def per_frame(fn, frames):
+        start = time.perf_counter()
+        for frame in frames:
+            fn(frame)
+        return (time.perf_counter() - start) / len(frames)
+
+    frame_bytes = height * width * 3
+    print(f"frame path: transient numpy/OpenCV allocations and time per {width}x{height} frame")
+    for name, fn in (("before", before), ("after", after)):
+        fn(captured[0])
+        transient = _transient_bytes(fn, captured)
+        print(f"{name:>7}: {transient / frame_bytes:4.1f} frames "
+              f"({transient / 1024:8.0f} KiB), {per_frame(fn, captured) * 1e3:.2f} ms/frame")
+    print(f"   pool: {pool.allocated} buffer(s) allocated in total")
+    # the part of "after" that runs on the GUI thread
+    rgb = [capture(frame) for frame in captured]
+    print(f"    GUI: {per_frame(show, rgb) * 1e3:.2f} ms/frame of that in showFrame")
+
+
+def bench_landmarks(n_frames=2000, width=720, height=480):
+    import math
+    import cv2
+    from Landmarks import finger_codes, gesture_table, measure
+
+    gestures = {"bass": [0, 0, 0, 0, 0], "mid": [0, 1, 0, 0, 0], "treble": [0, 0, 0, 0, 1],
+                "all": [1, 1, 1, 1, 1], "toggle": [1, 1, 0, 0, 1]}
+    rng = np.random.default_rng(0)
+    stream = rng.integers(0, 480, (n_frames, 2, 21, 3))
+    lists = stream.tolist()
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+
+    def find_distance(p1, p2):
+        # cvzone findDistance, which always drew on the frame
+        x1, y1, x2, y2 = p1[0], p1[1], p2[0], p2[1]
+        cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
+        cv2.circle(image, (x1, y1), 15, (255, 0, 255), cv2.FILLED)
+        cv2.circle(image, (x2, y2), 15, (255, 0, 255), cv2.FILLED)
+        cv2.line(image, (x1, y1), (x2, y2), (255, 0, 255), 3)
+        cv2.circle(image, (cx, cy), 15, (255, 0, 255), cv2.FILLED)
+        return math.hypot(x2 - x1, y2 - y1)
+
+    def before(hand):
+        # cvzone fingersUp, list comparison per gesture, two findDistance calls
+        fingers = [int(hand[4][0] > hand[3][0])]
+        fingers += [int(hand[tip][1] < hand[tip - 2][1]) for tip in (8, 12, 16, 20)]
+        band = next((name for name, g in gestures.items() if fingers == g), "none")
+        distance = find_distance(hand[8], hand[4])
+        palm = find_distance(hand[0], hand[5])
+        wrist, tip = np.array(hand[0]), np.array(hand[12])
+        angle = math.degrees(math.atan2(tip[1] - wrist[1], tip[0] - wrist[0]))
+        return band, distance, palm, angle
+
+    names, table = gesture_table(gestures)
+
+    def after(landmarks):
+        return table[finger_codes(landmarks, True)], measure(landmarks)
+
+    start = time.perf_counter()
+    for frame in lists:
+        before(frame[1])
+    t_before = (time.perf_counter() - start) / n_frames
+    start = time.perf_counter()
+    for frame in stream:
+        after(frame[1])
+    t_after = (time.perf_counter() - start) / n_frames
+    start = time.perf_counter()
+    after(stream[:, 1])
+    t_batch = (time.perf_counter() - start) / n_frames
+    print("gesture decode: per frame (gesture lookup, distances and angle of one hand)")
+    print(f"  lists + loops + drawing: {t_before * 1e6:7.1f} us")
+    print(f"  vectorized:              {t_after * 1e6:7.1f} us")
+    print(f"  vectorized, {n_frames} frames: {t_batch * 1e6:7.2f} us")
+
+
+def bench_meter_feed(block=1024, fs=FS, channels=2, n_blocks=200):
+    from RingBuffer import RingBuffer
+
+    ring = RingBuffer(fs // 2, shape=(channels,))
+    blocks = np.random.default_rng(0).standard_normal((n_blocks, block, channels))
+    out = np.empty((block, channels), dtype=np.float32)
+
+    def feed(b):
+        # callback side, plus the analyzer draining it so the ring never fills
+        ring.write(b)
+        ring.read(out)
+
+    feed(blocks[0])
+    transient = _transient_bytes(feed, blocks)
+    start = time.perf_counter()
+    for b in blocks:
+        ring.write(b)
+        ring.read(out)
+    t = (time.perf_counter() - start) / n_blocks
+    print(f"meter feed: copying a {block}x{channels} block into the analyzer ring")
+    print(f"  {t * 1e6:.1f} us per block ({t / (block / fs):.2%} of deadline), "
+          f"{transient:.0f} bytes allocated")
+
+
+def bench_gesture_filter(seconds=20.0, fps=30.0, misclassified=0.1, jitter=3.0):
+    from GestureFilter import GestureFilter
+
+    # a user holding "toggle", then sweeping bass gain slowly up and down;
+    # the classifier is wrong on some frames and the distance is noisy
+    rng = np.random.default_rng(0)
+    t = np.arange(0, seconds, 1 / fps)
+    truth = np.where(t < 0.5, "toggle", "bass")
+    wrong = rng.random(len(t)) < misclassified
+    gestures = np.where(wrong, rng.choice(["none", "mid", "toggle"], len(t)), truth)
+    gains = 50 + 40 * np.sin(2 * np.pi * t / 10) + jitter * rng.standard_normal(len(t))
+
+    def updates(results):
+        # what HandTracker emits: changes only, each one a set_gain downstream
+        sent, last = 0, None
+        for r in results:
+            if r != last:
+                sent, last = sent + 1, r
+        return sent
+
+    # before: toggle latched with a 20-frame cooldown, everything else raw
+    raw, mode, prev, cooldown = [], False, False, 0
+    for g, gain in zip(gestures, gains):
+        if g == "toggle":
+            if not prev and cooldown == 0:
+                mode, cooldown = not mode, 20
+            prev = True
+        else:
+            prev = False
+        cooldown = max(0, cooldown - 1)
+        raw.append((g if mode else "none", int(-20 + gain / 100 * 30), mode))
+
+    gf = GestureFilter()
+    filtered = []
+    for ti, g, gain in zip(t, gestures, gains):
+        band, gain, _, mode = gf.update(ti, g, gain, 0.5)
+        filtered.append((band, int(-20 + gain / 100 * 30), mode))
+    def flips(results):
+        modes = [False] + [r[2] for r in results]
+        return sum(a != b for a, b in zip(modes, modes[1:]))
+
+    print(f"gesture filter: {len(t)} frames, {misclassified:.0%} misclassified, "
+          f"+-{jitter} gain jitter")
+    print(f"  raw:      {updates(raw):4d} updates, adjust mode flipped {flips(raw)} times")
+    print(f"  filtered: {updates(filtered):4d} updates, adjust mode flipped "
+          f"{flips(filtered)} times")
+
+
+class _Volume:
+    def set_volume(self, volume):
+        self.volume = volume
+
+
+def bench_replay(log_path, fs=FS, block=1024):
+    from GestureLog import ReplayCamera, apply_gesture
+
+    camera = ReplayCamera(log_path, realtime=False)
+    camera.open()
+    eq = EQController(fs)
+    volume = _Volume()
+    x = _test_signal(block * 64, fs)
+    control, audio = [], []
+    prev_t, pos, pending, differ = 0.0, 0, 0.0, 0
+    while (frame := camera.read()) is not None:
+        t = camera.timestamp
+        start = time.perf_counter()
+        # landmarks -> gesture decode and filter -> EQ parameters
+        _, freq_band, gain, vol, adjust_mode = camera.handDetection(frame)
+        apply_gesture(eq, volume, freq_band, gain, vol)
+        control.append(time.perf_counter() - start)
+        if (freq_band, adjust_mode) != tuple(frame.record[2:6:3]):
+            differ += 1
+        # render the audio that played between this gesture frame and the last
+        pending += (t - prev_t) * fs / block
+        prev_t = t
+        while pending >= 1:
+            start = time.perf_counter()
+            eq.process(x[pos:pos + block])
+            audio.append(time.perf_counter() - start)
+            pos = (pos + block) % len(x)
+            pending -= 1
+    control, audio = np.array(control), np.array(audio)
+    print(f"replay of {log_path}: {len(control)} gesture frames, {len(audio)} audio blocks")
+    print(f"  landmarks -> EQ: median {np.median(control) * 1e6:.1f} us, "
+          f"max {control.max() * 1e6:.1f} us")
+    print(f"  {differ} results differ from the recorded band / adjust mode")
+    if len(audio):
+        deadline = block / fs
+        print(f"  audio block:     median {np.median(audio) * 1e3:.3f} ms "
+              f"({np.median(audio) / deadline:.1%} of deadline), "
+              f"p99 {np.percentile(audio, 99) / deadline:.1%}")
+
+
+# -- DSP regression suite --
+#
+# Every case renders a synthetic signal through EQController.process or
+# AudioPlayer.callback and records the typical and p99 time per block as a
+# fraction of the block's deadline, the bytes allocated per block, and
+# evenly spaced samples of each output channel. A run is compared against
+# a stored baseline and fails on slower blocks, more allocation, a changed
+# render, or a static render that depends on the block size. Timings are
+# scaled by a fixed reference workload, timed several times at the start of
+# the run and taken as the median, so a machine that is clocked lower than
+# when the baseline was taken does not read as a regression. A case is only
+# slower when it exceeds the tolerance and LOAD_MARGIN of its deadline.
+
+AUTOMATIONS = ("static", "gain_sweep", "gesture_steps", "cutoff_sweep")
+# every case starts from this low/mid/high setting, so the filters are not flat
+PRESET_DB = (6.0, -3.0, 4.0)
+RENDER_POINTS = 128
+LOAD_MARGIN = 0.01
+
+
+def suite_cases():
+    cases = []
+    for engine in ENGINES:
+        for block in BLOCK_SIZES:
+            cases.append(("eq", engine, FS, 2, block, "static"))
+        for automation in AUTOMATIONS[1:]:
+            cases.append(("eq", engine, FS, 2, 256, automation))
+        for fs in (48000, 96000):
+            for channels in (1, 2):
+                cases.append(("eq", engine, fs, channels, 1024, "gain_sweep"))
+    for engine in ("crossover", "parametric"):
+        for block in (256, 1024):
+            cases.append(("player", engine, FS, 2, block, "gesture_steps"))
+    return cases
+
+
+def case_id(case):
+    target, engine, fs, channels, block, automation = case
+    return f"{target}/{engine}/{fs}/{channels}ch/{block}/{automation}"
+
+
+def _automation(kind, eq, fs, player=None):
+    # called before every block with its first frame; applies the control
+    # value of each gesture tick the block starts in
+    period = int(fs / CONTROL_RATE)
+    rng = np.random.default_rng(1)
+    steps = rng.choice([-12.0, -6.0, 0.0, 6.0, 12.0], size=(4096, 3))
+    last = [None]
+
+    def automate(frame):
+        tick = frame // period
+        if kind == "static" or tick == last[0]:
+            return
+        last[0] = tick
+        phase = 2 * np.pi * tick * period / fs
+        if kind == "gain_sweep":
+            eq.set_gain(9 * np.sin(phase), 6 * np.sin(2 * phase), -9 * np.sin(phase))
+        elif kind == "gesture_steps":
+            eq.set_gain(*steps[tick % len(steps)])
+            if player is not None:
+                player.set_volume(0.5 + 0.4 * np.sin(phase))
+        elif kind == "cutoff_sweep":
+            eq.set_low_cut(300 + 200 * np.sin(phase))
+            eq.set_high_cut(9000 + 3000 * np.sin(phase))
+    return automate
+
+
+class _SignalCache:
+    # stands in for an AudioCache hit, so the player plays the test signal
+    def __init__(self, samples):
+        self.samples = samples
+
+    def get(self, filename, fs, channels=1):
+        return self.samples
+
+
+def _suite_signal(fs, channels, seconds):
+    frames = int(fs * seconds)
+    return np.stack([_test_signal(frames, fs, seed=c) for c in range(channels)], axis=1)
+
+
+def _case_runner(case, x):
+    # a fresh engine and a function that renders block i into y
+    target, engine, fs, channels, block, automation = case
+    eq = EQController(fs, engine=engine, channels=channels)
+    eq.set_gain(*PRESET_DB)
+    if target == "eq":
+        automate = _automation(automation, eq, fs)
+
+        def run(i, y):
+            y[i * block:(i + 1) * block] = eq.process(x[i * block:(i + 1) * block])
+        return eq, automate, run, None
+
+    AudioPlayer = _player_class()
+    player = AudioPlayer("test-signal", eq, cache=_SignalCache(x.astype(np.float32)),
+                         blocksize=block, adaptive=False)
+    player.paused = False
+    automate = _automation(automation, eq, fs, player)
+    status = types.SimpleNamespace(output_underflow=False)
+
+    def run(i, y):
+        player.callback(y[i * block:(i + 1) * block], block, None, status)
+    return eq, automate, run, player
+
+
+def _render_points(y, points=RENDER_POINTS):
+    # evenly spaced samples per channel: enough to catch a changed response,
+    # a one-sample delay, a polarity flip or swapped channels
+    step = len(y) // points
+    return np.round(y[step // 2::step][:points].T, 7).tolist()
+
+
+def _player_class():
+    # the callback cases never open a stream; without PortAudio the player is
+    # imported against an empty sounddevice so headless runs still drive it
+    try:
+        import sounddevice  # noqa: F401
+    except (ImportError, OSError) as e:
+        print(f"sounddevice unavailable ({e}); the player cases run without it")
+        sys.modules["sounddevice"] = types.ModuleType("sounddevice")
+    from AudioPlayer import AudioPlayer
+    return AudioPlayer
+
+
+def _reference_time(repeat=5):
+    # a fixed filter + FFT workload shaped like one stereo block of the EQ
+    from scipy import signal
+    sos = signal.butter(6, [300, 3000], btype="band", fs=FS, output="sos")
+    x = _suite_signal(FS, 2, 1024 / FS)
+    zi = np.zeros((len(sos), 2, 2))
+    best = float("inf")
+    # the first passes in a fresh process run slow; they warm up only
+    for i in range(repeat + 5):
+        start = time.perf_counter()
+        for _ in range(50):
+            y, _ = signal.sosfilt(sos, x, axis=0, zi=zi)
+            np.fft.irfft(np.fft.rfft(y, axis=0), axis=0)
+        if i >= 5:
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _machine_time(runs=9):
+    # median of several reference runs; one run alone wanders by up to 2x
+    return float(np.median([_reference_time() for _ in range(runs)]))
+
+
+def run_case(case, seconds=1.0, repeat=5):
+    _, _, fs, channels, block, automation = case
+    x = _suite_signal(fs, channels, seconds)
+    n_blocks = len(x) // block
+    y = np.zeros((n_blocks * block, channels))
+
+    times = np.empty((repeat, n_blocks))
+    for r in range(repeat):
+        eq, automate, run, player = _case_runner(case, x)
+        for i in range(n_blocks):
+            # automation runs on the GUI thread in the app; not timed
+            automate(i * block)
+            start = time.perf_counter()
+            run(i, y)
+            times[r, i] = time.perf_counter() - start
+        if player is not None:
+            player.close()
+    # fastest of the repeats per block drops most scheduler noise; then the
+    # mean of all but the slowest tenth, since blocks that pick up a
+    # parameter change cost more and the median would jump between the two
+    per_block = np.sort(times.min(axis=0))
+    typical = per_block[:max(1, n_blocks * 9 // 10)].mean()
+    deadline = block / fs
+    result = {"load": typical / deadline, "p99": np.percentile(per_block, 99) / deadline,
+              "render": _render_points(y)}
+
+    # transient allocation per block, after a warm-up block
+    eq, automate, run, player = _case_runner(case, x)
+    scratch = np.zeros_like(y)
+    automate(0)
+    run(0, scratch)
+    tracemalloc.start()
+    peaks = []
+    for i in range(1, min(n_blocks, 50)):
+        automate(i * block)
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        run(i, scratch)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    if player is not None:
+        player.close()
+    result["bytes"] = int(np.median(peaks))
+
+    if automation == "static" and case[0] == "eq":
+        # the output may not depend on how the signal is cut into blocks
+        whole = EQController(fs, engine=case[1], channels=channels)
+        whole.set_gain(*PRESET_DB)
+        whole = whole.process(x)
+        result["block_error"] = float(np.abs(y - whole[:len(y)]).max())
+    return result
+
+
+def _compare(result, base, tolerance, scale=1.0):
+    failures = []
+    if result["load"] >= 1.0:
+        failures.append(f"misses its deadline ({result['load']:.0%})")
+    if result.get("block_error", 0.0) > 1e-6:
+        failures.append(f"output depends on block size (error {result['block_error']:.2e})")
+    if base is None:
+        return failures
+    expected = base["load"] * scale
+    if result["load"] > expected * (1 + tolerance) and result["load"] - expected > LOAD_MARGIN:
+        failures.append(f"slower: {expected:.2%} expected, {result['load']:.2%} of deadline")
+    if result["bytes"] > base["bytes"] * (1 + tolerance) + 4096:
+        failures.append(f"allocates more: {base['bytes']} -> {result['bytes']} bytes per block")
+    render, reference = np.array(result["render"]), np.array(base["render"])
+    if render.shape != reference.shape:
+        failures.append(f"render shape changed: {reference.shape} -> {render.shape}")
+    else:
+        for channel, error in enumerate(np.abs(render - reference).max(axis=1)):
+            if error > 1e-5:
+                failures.append(f"channel {channel} differs from the reference render "
+                                f"(max error {error:.2e})")
+    return failures
+
+
+def bench_suite(baseline_path=BASELINE, update=False, tolerance=0.5, pattern=None):
+    baseline, machine_time = {}, None
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            stored = json.load(f)
+        baseline, machine_time = stored["cases"], stored.get("reference_time")
+    cases = [c for c in suite_cases() if pattern is None or pattern in case_id(c)]
+    print(f"DSP suite: {len(cases)} cases against "
+          f"{baseline_path if baseline else 'no baseline'}")
+    reference = _machine_time()
+    # stored loads are in the baseline machine's units; a partial update is
+    # converted to them
+    scale = reference / machine_time if machine_time else 1.0
+    print(f"reference workload: {reference * 1e3:.2f} ms ({scale:.2f}x the baseline machine)")
+    print(f"{'case':<46} {'load':>7} {'p99':>7} {'bytes':>8}  status")
+    results, failed = {}, []
+    for case in cases:
+        name = case_id(case)
+        base = None if update else baseline.get(name)
+        result = run_case(case)
+        failures = _compare(result, base, tolerance, scale)
+        for _ in range(2):
+            if not failures:
+                break
+            # measure again so a burst of machine noise is not a regression
+            result = run_case(case)
+            failures = _compare(result, base, tolerance, scale)
+        results[name] = dict(result, load=result["load"] / scale, p99=result["p99"] / scale)
+        status = "FAIL" if failures else ("new" if name not in baseline else "ok")
+        print(f"{name:<46} {result['load']:>6.1%} {result['p99']:>6.1%} "
+              f"{result['bytes']:>8}  {status}")
+        for failure in failures:
+            print(f"    {failure}")
+            failed.append((name, failure))
+
+    if update and not failed:
+        baseline.update(results)
+        with open(baseline_path, "w") as f:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(),
+                       "numpy": np.__version__, "reference_time": machine_time or reference,
+                       "cases": baseline}, f, indent=1)
+        print(f"baseline written to {baseline_path}")
+    if failed:
+        print(f"\n{len(failed)} REGRESSIONS in {len({name for name, _ in failed})} cases:")
+        for name, failure in failed:
+            print(f"  {name}: {failure}")
+    return not failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks and DSP regression suite.")
+    parser.add_argument("log", nargs="?", help="gesture log to replay through the EQ")
+    parser.add_argument("--suite", action="store_true",
+                        help="run only the DSP regression suite; exit 1 on a regression")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update", action="store_true",
+                        help="record this run as the suite's baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed slowdown / extra allocation as a fraction")
+    parser.add_argument("-k", dest="pattern", help="only cases whose name contains this")
+    args = parser.parse_args()
+    if args.suite or args.update:
+        sys.exit(0 if bench_suite(args.baseline, args.update, args.tolerance,
+                                  args.pattern) else 1)
+
+    bench_limiter()
+    print()
+    bench_engines()
+    print()
+    bench_bands()
+    print()
+    bench_frame_path()
+    print()
+    bench_meter_feed()
+    print()
+    bench_landmarks()
+    print()
+    bench_gesture_filter()
+    if args.log:
+        print()
+        bench_replay(args.log)
@@ -1,11 +1,17 @@
-import threading
 from PyQt6 import uic
 from PyQt6.QtCore import QTimer
-from PyQt6.QtWidgets import QMainWindow, QApplication, QMessageBox, QFileDialog
+from PyQt6.QtWidgets import QMainWindow, QApplication, QMessageBox, QFileDialog, QLabel
 from PyQt6.QtGui import QPixmap, QImage
 
-from AudioPlayer import AudioPlayer
-from EqController import EQController
+from AudioCache import AudioCache
+from GestureLog import apply_gesture
+from HandTracker import HandTracker
+from SpectrumAnalyzer import SpectrumAnalyzer
+from Tracer import tracer
+
+# the audio engine (SciPy, PortAudio, pydub) is imported on first use, or
+# ahead of it by main's background preload, so the window shows first
+AUDIO_MODULES = ("EqController", "AudioPlayer", "StreamDecoder")
 
 
 class UI_Window(QMainWindow):
@@ -14,9 +20,25 @@ class UI_Window(QMainWindow):
         super().__init__()
         uic.loadUi("GUI.ui", self)
         self.camera = camera
-        # Create a timer.
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.nextFrameSlot)
+        # capture and inference run off the GUI thread; results arrive as signals
+        self.tracker = HandTracker(camera)
+        self.tracker.frameReady.connect(self.showFrame)
+        self.tracker.calibrated.connect(self.calibrated)
+        self.tracker.gestureDetected.connect(self.applyGesture)
+
+        # latency overlay on top of the camera view, only while tracing
+        self.trace_label = QLabel(self.cam_display)
+        self.trace_label.setStyleSheet(
+            "color: #0f0; background: rgba(0, 0, 0, 160); font-family: monospace;")
+        self.trace_label.setVisible(tracer.enabled)
+        self.trace_timer = QTimer()
+        self.trace_timer.timeout.connect(self.updateTraceOverlay)
+        if tracer.enabled:
+            self.trace_timer.start(500)
+
+        # output spectrum and meters, analyzed off the audio thread
+        self.analyzer = SpectrumAnalyzer()
+        self.analyzer.updated.connect(self.spectrum_view.setMeter)
 
         self.initialized = False
         self.initialize_button.clicked.connect(self.start)
@@ -24,10 +46,10 @@ class UI_Window(QMainWindow):
         self.audio_file = ""
         self.eq_controller = None
         self.player = None
+        self.audio_cache = AudioCache()
         self.insert_button.clicked.connect(self.insertAudio)
 
         self.is_played = False
-        self.play_thread = None
         self.play_button.clicked.connect(self.playAudio)
 
         self.volume_slider.valueChanged.connect(self.setVolume)
@@ -42,6 +64,10 @@ class UI_Window(QMainWindow):
     def start(self):
         if self.initialized:
             self.initialized = False
+            self.tracker.calibrating = True
+            return
+
+        if self.tracker.running:
             return
 
         if not self.camera.open():
@@ -51,40 +77,70 @@ class UI_Window(QMainWindow):
             msgBox.exec_()
             return
 
-        self.timer.start(int(1000/24))
+        if self.camera.loadCalibration():
+            # a saved calibration for this user and frame size; skip the dance
+            self.tracker.calibrating = False
+            self.calibrated()
+        self.tracker.start()
+
+    def closeEvent(self, event):
+        self.tracker.stop()
+        self.analyzer.stop()
+        if self.player:
+            self.player.close()
+        super().closeEvent(event)
+
+    def calibrated(self):
+        self.initialized = True
+        self.initialize_button.setText("ReInitialize?")
 
     def insertAudio(self):
-        self.audio_file = QFileDialog.getOpenFileName(
+        files = QFileDialog.getOpenFileNames(
             self,
-            'Open file',
+            'Open files',
             '${HOME}',
             "Audio files (*.mp3)"
         )[0]
 
-        if not self.audio_file:
+        if not files:
             return
 
-        self.pauseAudio()
-        self.eq_controller = EQController(44100)
-        self.player = AudioPlayer(self.audio_file, self.eq_controller)
+        from AudioPlayer import AudioPlayer
+        from EqController import EQController
+        from StreamDecoder import probe
+
+        if self.player:
+            # queue behind the current track; stream and EQ stay as they are
+            for filename in files:
+                self.player.enqueue(filename)
+            return
+
+        self.audio_file = files[0]
+        fs, channels = probe(self.audio_file)
+        self.eq_controller = EQController(fs, channels=channels)
+        self.player = AudioPlayer(
+            self.audio_file, self.eq_controller, streaming=True,
+            cache=self.audio_cache)
+        for filename in files[1:]:
+            self.player.enqueue(filename)
+        self.analyzer.attach(self.player)
+        self.analyzer.start()
+        self.tracker.detecting = True
 
     def pauseAudio(self):
         if self.player:
-            self.player.stop()
-            if self.play_thread:
-                self.play_thread = None
+            self.player.pause()
 
     def playAudio(self):
         if not self.player:
             return
 
-        if self.is_played:
+        # a track that played to the end has paused itself
+        if self.player.paused:
+            self.player.resume()
+        else:
             self.pauseAudio()
-        elif not self.play_thread:
-            self.play_thread = threading.Thread(
-                target=self.player.play, daemon=True)
-            self.play_thread.start()
-        self.is_played = not self.is_played
+        self.is_played = not self.player.paused
 
     def setVolume(self, value):
         if not self.player:
@@ -134,46 +190,50 @@ class UI_Window(QMainWindow):
 
         self.eq_controller.set_gain(low_db=value)
 
-    def nextFrameSlot(self):
-        frame = self.camera.read()
-        if frame is not None:
-            if not self.initialized:
-                self.initialized = self.camera.initializeHandDetection(frame)
-                if self.initialized:
-                    self.initialize_button.setText("ReInitialize?")
-            elif self.player:
-                frame, freq_band, gain, volume, adjust_mode = self.camera.handDetection(
-                    frame)
-
-                if adjust_mode and self.activated_label.text() == "OFF":
-                    self.activated_label.setText("ON")
-                elif not adjust_mode and self.activated_label.text() == "ON":
-                    self.activated_label.setText("OFF")
-
-                if not freq_band in ["none", "toggle"]:
-                    if freq_band == "all":
-                        self.player.set_volume(volume)
-                        self.volume_slider.setValue(int(volume*100))
-                    else:
-                        gain_db = int(-20 + (gain / 100.0) * 30)
-                        if freq_band == "bass":
-                            self.eq_controller.set_gain(low_db=gain_db)
-                        elif freq_band == "mid":
-                            self.eq_controller.set_gain(mid_db=gain_db)
-                        elif freq_band == "treble":
-                            self.eq_controller.set_gain(high_db=gain_db)
-
-                        UI_SLIDER_BANDS = {
-                            "bass": self.low_gain_slider,
-                            "mid": self.band_gain_slider,
-                            "treble": self.high_gain_slider,
-                        }
-                        UI_SLIDER_BANDS[freq_band].setValue(gain_db)
-
-            image = QImage(
-                frame, frame.shape[1], frame.shape[0], QImage.Format.Format_RGB888)
-            pixmap = QPixmap.fromImage(image)
-            self.cam_display.setPixmap(pixmap)
+    def applyGesture(self, freq_band, gain, volume, adjust_mode, stamps):
+        # stamps travel with the result; the tracker may be frames ahead by now
+        captured, emitted, frame = stamps
+        tracer.span("dispatch", emitted, frame)
+        if not self.player:
+            return
+
+        if adjust_mode and self.activated_label.text() == "OFF":
+            self.activated_label.setText("ON")
+        elif not adjust_mode and self.activated_label.text() == "ON":
+            self.activated_label.setText("OFF")
+
+        gain_db = apply_gesture(
+            self.eq_controller, self.player, freq_band, gain, volume)
+        if freq_band == "all":
+            self.volume_slider.setValue(int(volume*100))
+        elif gain_db is not None:
+            UI_SLIDER_BANDS = {
+                "bass": self.low_gain_slider,
+                "mid": self.band_gain_slider,
+                "treble": self.high_gain_slider,
+            }
+            UI_SLIDER_BANDS[freq_band].setValue(gain_db)
+        tracer.span("gesture", captured, frame)
+
+    def updateTraceOverlay(self):
+        text = tracer.summary_text()
+        if self.player:
+            text += (f"\nunderflows {self.player.underflows}"
+                     f"\nblock      {self.player.blocksize}")
+        self.trace_label.setText(text)
+        self.trace_label.adjustSize()
+
+    def showFrame(self):
+        frame = self.tracker.latestFrame()
+        if frame is None:
+            return
+        # the tracker already converted to RGB; fromImage makes the only copy
+        image = QImage(
+            frame.data, frame.shape[1], frame.shape[0], frame.strides[0],
+            QImage.Format.Format_RGB888)
+        pixmap = QPixmap.fromImage(image)
+        self.cam_display.setPixmap(pixmap)
+        self.camera.release(frame)
 
 
 if __name__ == '__main__':
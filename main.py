@@ -1,12 +1,63 @@
+import time
+START = time.perf_counter()
+
+import argparse
+import importlib
+import threading
+from PyQt6.QtCore import QTimer
 from PyQt6.QtWidgets import QApplication
-from loadGUI import UI_Window
-from Camera import Camera
+from loadGUI import AUDIO_MODULES, UI_Window
+
+
+def report(what):
+    print(f"startup: {what} after {(time.perf_counter() - START) * 1e3:.0f} ms")
+
+
+def preload(camera):
+    # heavy imports and the hand detector, loaded while the window is up
+    for module in AUDIO_MODULES:
+        importlib.import_module(module)
+    report("audio engine loaded")
+    camera.warmup()
+    report("hand detector loaded")
+
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--record", metavar="LOG",
+                        help="write every gesture result to a replayable log")
+    parser.add_argument("--replay", metavar="LOG",
+                        help="drive the app from a gesture log instead of the webcam")
+    parser.add_argument("--trace", metavar="JSON",
+                        help="trace control latency; show an overlay and write a "
+                             "Chrome trace (chrome://tracing) on exit")
+    parser.add_argument("--profile",
+                        help="calibration profile to load and save (default: user name)")
+    args = parser.parse_args()
+
+    if args.trace:
+        from Tracer import tracer
+        tracer.enabled = True
 
-    camera = Camera(0)
+    if args.replay:
+        from GestureLog import ReplayCamera
+        camera = ReplayCamera(args.replay)
+    else:
+        from Camera import Camera
+        camera = Camera(0, detect_interval=3, profile=args.profile)
+        if args.record:
+            from GestureLog import GestureRecorder
+            camera.recorder = GestureRecorder(args.record, camera)
 
     app = QApplication([])
     start_window = UI_Window(camera)
     start_window.show()
-    app.exit(app.exec())
+    # the first event loop pass after show() is when the window takes input
+    QTimer.singleShot(0, lambda: report("window interactive"))
+    threading.Thread(target=preload, args=(camera,), daemon=True).start()
+    status = app.exec()
+    if getattr(camera, "recorder", None):
+        camera.recorder.close()
+    if args.trace:
+        tracer.dump_chrome(args.trace)
+    app.exit(status)
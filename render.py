@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from pydub import AudioSegment
+
+from EqController import EQController
+from StreamDecoder import probe
+
+# Preset file format (JSON), every key optional:
+# {"engine": "crossover", "volume": 1.0,
+#  "gains": {"low": 0.0, "mid": 0.0, "high": 0.0},
+#  "bands": 10, "band_gains": [0.0, ...],  (graphic/fft engines, one gain per band)
+#  "low_cut": 300, "mid_center": 2000, "mid_bandwidth": 800, "high_cut": 10000,
+#  "limiter": {"threshold_db": -1.0, "attack_ms": 1.0, "release_ms": 100.0,
+#              "lookahead_ms": 0.0, "enabled": true}}
+
+
+def load_preset(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def build_eq(preset, fs, channels):
+    # no parameter ramps offline: the preset applies from the first sample.
+    # Cutoffs go to the constructor; changing them afterwards would make the
+    # filter bank crossfade in from the default design
+    cutoffs = {key: preset[key] for key in ("low_cut", "mid_center", "mid_bandwidth", "high_cut")
+               if key in preset}
+    if ("mid_center" in preset or "mid_bandwidth" in preset) and "high_cut" not in preset:
+        # the high cut follows the mid band, as set_mid_bandwidth does
+        cutoffs["high_cut"] = None
+    eq = EQController(fs, engine=preset.get("engine", "crossover"), smoothing_ms=0.0,
+                      channels=channels, bands=preset.get("bands", 10), **cutoffs)
+    gains = preset.get("gains", {})
+    eq.set_gain(low_db=gains.get("low", 0.0), mid_db=gains.get("mid", 0.0),
+                high_db=gains.get("high", 0.0))
+    for index, gain_db in enumerate(preset.get("band_gains", [])):
+        eq.set_band_gain(index, gain_db)
+    eq.set_limiter(**preset.get("limiter", {}))
+    return eq
+
+
+def render_file(filename, out_filename, preset, chunk_seconds=10.0):
+    start = time.perf_counter()
+    fs, channels = probe(filename)
+    eq = build_eq(preset, fs, channels)
+    volume = max(0.0, min(preset.get("volume", 1.0), 1.0))
+
+    decoder = subprocess.Popen(
+        [AudioSegment.converter, "-v", "quiet", "-i", filename,
+         "-f", "f32le", "-acodec", "pcm_f32le", "-ac", str(channels), "-ar", str(fs), "-"],
+        stdout=subprocess.PIPE, stdin=subprocess.DEVNULL)
+    encoder = subprocess.Popen(
+        [AudioSegment.converter, "-v", "quiet", "-y",
+         "-f", "f32le", "-ac", str(channels), "-ar", str(fs), "-i", "-", out_filename],
+        stdin=subprocess.PIPE)
+
+    def write(out):
+        out *= volume
+        np.clip(out, -1.0, 1.0, out=out)
+        encoder.stdin.write(out.astype(np.float32).tobytes())
+
+    # large chunks keep the per-call overhead negligible; filter state carries over
+    frame_bytes = 4 * channels
+    raw = bytearray(int(chunk_seconds * fs) * frame_bytes)
+    frames = 0
+    # the output trails the input by the EQ's latency: drop that much from
+    # the start and flush as much silence through at the end, so the render
+    # lines up with the source
+    skip = eq.latency
+    try:
+        while True:
+            nbytes = decoder.stdout.readinto(raw)
+            if not nbytes:
+                break
+            n = nbytes // frame_bytes
+            chunk = np.frombuffer(raw, dtype=np.float32, count=n * channels)
+            out = eq.process(chunk.reshape(n, channels))
+            dropped = min(skip, n)
+            skip -= dropped
+            write(out[dropped:])
+            frames += n
+        if eq.latency:
+            write(eq.process(np.zeros((eq.latency, channels)))[skip:])
+    finally:
+        encoder.stdin.close()
+        decoder.stdout.close()
+        decoder.wait()
+        encoder.wait()
+    if decoder.returncode or encoder.returncode:
+        raise RuntimeError(f"ffmpeg failed while rendering {filename}")
+    return filename, frames / fs, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render audio files through a saved EQ/volume preset.")
+    parser.add_argument("preset", help="JSON preset file")
+    parser.add_argument("files", nargs="+", help="input audio files")
+    parser.add_argument("-o", "--output-dir", default="rendered")
+    parser.add_argument("-f", "--format", default="wav", help="output file extension")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="files rendered in parallel")
+    parser.add_argument("--chunk-seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    preset = load_preset(args.preset)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    total_audio = 0.0
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = []
+        for filename in args.files:
+            name = os.path.splitext(os.path.basename(filename))[0]
+            out_filename = os.path.join(args.output_dir, f"{name}.{args.format}")
+            futures.append(pool.submit(
+                render_file, filename, out_filename, preset, args.chunk_seconds))
+        for future in as_completed(futures):
+            filename, duration, elapsed = future.result()
+            total_audio += duration
+            print(f"{filename}: {duration:.1f} s of audio in {elapsed:.2f} s "
+                  f"({duration / elapsed:.1f}x realtime)")
+    wall = time.perf_counter() - start
+    print(f"total: {total_audio:.1f} s of audio in {wall:.2f} s "
+          f"({total_audio / wall:.1f}x realtime on {args.jobs} workers)")
+
+
+if __name__ == "__main__":
+    main()
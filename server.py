@@ -0,0 +1,44 @@
+import argparse
+import time
+
+from HandServer import DEFAULT_PORT, HandServer
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Headless hand-control server: hand detection for several "
+                    "stations on a shared worker pool, gesture events over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="detector processes (default: one per core)")
+    parser.add_argument("--camera", type=int, action="append", default=[],
+                        help="also serve a local camera as session camN; repeatable")
+    parser.add_argument("--profile", help="calibration profile for local cameras")
+    parser.add_argument("--stats", type=float, default=10.0,
+                        help="seconds between throughput reports, 0 to disable")
+    args = parser.parse_args()
+
+    server = HandServer(args.host, args.port, args.workers)
+    server.start()
+    for index in args.camera:
+        server.add_camera(index, profile=args.profile)
+    print(f"serving on {server.address[0]}:{server.address[1]} "
+          f"with {server.workers} workers")
+    try:
+        frames = 0
+        while True:
+            time.sleep(args.stats or 3600)
+            if args.stats:
+                total = sum(s.frames for s in server.sessions.values())
+                print(f"{len(server.sessions)} sessions, "
+                      f"{(total - frames) / args.stats:.1f} frames/s, {server.events} events")
+                frames = total
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()